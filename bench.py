@@ -0,0 +1,299 @@
+"""Benchmarks for my-shell.py and updated-shell.py on synthetic workloads.
+
+Generates a reproducible workload (a wide directory, a branching tree, a deep
+directory chain and a large file) once under --workdir, times the shell
+functions against it and writes the results as JSON:
+
+    python bench.py                          # everything, results in bench_results.json
+    python bench.py --only find,ls --repeat 10
+    python bench.py --output new.json --compare bench_results.json
+
+Each benchmark is run --repeat times; the JSON keeps every run plus the
+minimum and median, in seconds.
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import select
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = ["my-shell.py", "updated-shell.py"]
+WORKLOAD_VERSION = 1
+
+# Workload
+def generate_workload(workdir, wide, depth, fanout, chain, big_file_mb):
+    """Create the synthetic tree under workdir unless an identical one is already there."""
+    params = {"version": WORKLOAD_VERSION, "wide": wide, "depth": depth, "fanout": fanout,
+              "chain": chain, "big_file_mb": big_file_mb}
+    manifest = os.path.join(workdir, "manifest.json")
+    try:
+        with open(manifest) as f:
+            if json.load(f) == params:
+                return params
+    except (OSError, ValueError):
+        pass
+    print(f"Generating workload in {workdir} ...", file=sys.stderr)
+    shutil.rmtree(workdir, ignore_errors=True)
+    os.makedirs(workdir)
+    rng = random.Random(42)
+
+    wide_dir = os.path.join(workdir, "wide")
+    os.mkdir(wide_dir)
+    for i in range(wide):
+        with open(os.path.join(wide_dir, f"file{i:06d}.txt"), "w") as f:
+            f.write("x" * rng.randrange(0, 512))
+
+    def grow(path, level):
+        for i in range(3):
+            with open(os.path.join(path, f"data{i}.log" if i else "target.txt"), "w") as f:
+                f.write(path)
+        if level < depth:
+            for i in range(fanout):
+                child = os.path.join(path, f"d{level}_{i}")
+                os.mkdir(child)
+                grow(child, level + 1)
+    tree_dir = os.path.join(workdir, "tree")
+    os.mkdir(tree_dir)
+    grow(tree_dir, 0)
+
+    path = os.path.join(workdir, "deep")
+    for i in range(chain):
+        path = os.path.join(path, f"level{i}")
+    os.makedirs(path)
+    open(os.path.join(path, "bottom.txt"), "w").close()
+
+    block = rng.randbytes(1 << 20)
+    with open(os.path.join(workdir, "big.bin"), "wb") as f:
+        for _ in range(big_file_mb):
+            f.write(block)
+
+    with open(manifest, "w") as f:
+        json.dump(params, f)
+    return params
+
+# Harness
+def load_script(script):
+    """Import a shell script (the file names are not valid module names) as a module."""
+    name = script.replace("-", "_").removesuffix(".py")
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, script))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _drain(fd):
+    while os.read(fd, 1 << 20):
+        pass
+    os.close(fd)
+
+@contextlib.contextmanager
+def silenced(pipe=False):
+    """Discard stdout (both sys.stdout and file descriptor 1).
+
+    Output goes to /dev/null, or with pipe to a pipe drained by a thread:
+    Linux completes sendfile() to /dev/null without reading the file, so
+    cat has to write somewhere real to be measured.
+    """
+    sys.stdout.flush()
+    saved_fd = os.dup(1)
+    saved_stdout = sys.stdout
+    reader = None
+    if pipe:
+        read_fd, sink = os.pipe()
+        reader = threading.Thread(target=_drain, args=(read_fd,))
+        reader.start()
+    else:
+        sink = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(sink, 1)
+    os.close(sink)
+    sys.stdout = io.TextIOWrapper(os.fdopen(os.dup(1), "wb"), write_through=False)
+    try:
+        yield
+    finally:
+        sys.stdout.close()
+        sys.stdout = saved_stdout
+        os.dup2(saved_fd, 1)
+        os.close(saved_fd)
+        if reader is not None:
+            reader.join()
+
+def measure(function, repeat, pipe=False):
+    """Run function repeat times with stdout discarded; return the wall times in seconds."""
+    runs = []
+    for _ in range(repeat):
+        with silenced(pipe):
+            started = time.perf_counter()
+            function()
+            runs.append(time.perf_counter() - started)
+    return runs
+
+def summarize(runs, **extra):
+    result = {"runs": [round(run, 6) for run in runs], "min": round(min(runs), 6),
+              "median": round(statistics.median(runs), 6)}
+    result.update(extra)
+    return result
+
+def time_to_prompt(script, env, repeat):
+    """Start script on a pseudo-terminal and time until its first prompt appears."""
+    import pty
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        pid, fd = pty.fork()
+        if pid == 0:
+            os.execve(sys.executable, [sys.executable, os.path.join(HERE, script)], env)
+        output = b""
+        try:
+            while b"$ " not in output:
+                ready, _, _ = select.select([fd], [], [], 10)
+                if not ready:
+                    raise RuntimeError(f"{script}: no prompt within 10 seconds")
+                output += os.read(fd, 4096)
+            runs.append(time.perf_counter() - started)
+            os.write(fd, b"\x04")
+        finally:
+            os.waitpid(pid, 0)
+            os.close(fd)
+    return runs
+
+def run_commands(script, commands, env):
+    """Feed command lines to a script's main loop on stdin; return the wall time."""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(HERE, script)], input="\n".join(commands) + "\n",
+                   text=True, env=env, stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - started
+
+# Benchmarks
+def benchmark_script(script, workdir, params, repeat, only, env):
+    """Time every benchmark the script supports; return {benchmark name: summary}."""
+    shell = load_script(script)
+    results = {}
+
+    def wanted(name):
+        return not only or any(name.startswith(prefix) for prefix in only)
+
+    def record(name, runs, **extra):
+        results[name] = summarize(runs, **extra)
+        print(f"  {script:<18} {name:<28} median {results[name]['median'] * 1000:10.2f} ms", file=sys.stderr)
+
+    wide_dir = os.path.join(workdir, "wide")
+    tree_dir = os.path.join(workdir, "tree")
+    deep_dir = os.path.join(workdir, "deep")
+    big_file = os.path.join(workdir, "big.bin")
+
+    if wanted("find"):
+        if hasattr(shell, "iter_find"):
+            record("find.tree", measure(lambda: shell.find_files("target", tree_dir, use_index=False), repeat))
+            record("find.deep", measure(lambda: shell.find_files("bottom", deep_dir, use_index=False), repeat))
+            with silenced():
+                shell.build_index(tree_dir)
+            record("find.tree_indexed", measure(lambda: shell.find_files("target", tree_dir), repeat))
+        else:
+            record("find.tree", measure(lambda: shell.find_files("target", tree_dir), repeat))
+            record("find.deep", measure(lambda: shell.find_files("bottom", deep_dir), repeat))
+    if wanted("ls"):
+        record("ls.wide", measure(lambda: shell.list_files(wide_dir), repeat), entries=params["wide"])
+        if "long_format" in shell.list_files.__code__.co_varnames:
+            record("ls.wide_long", measure(lambda: shell.list_files(wide_dir, long_format=True), repeat),
+                   entries=params["wide"])
+            record("ls.tree_recursive", measure(lambda: shell.list_files(tree_dir, recursive=True), repeat))
+    if wanted("cat") and hasattr(shell, "cat_file"):
+        size = os.path.getsize(big_file)
+        runs = measure(lambda: shell.cat_file(big_file), repeat, pipe=True)
+        record("cat.big_file", runs, bytes=size, mb_per_s=round(size / min(runs) / 1e6, 1))
+    if wanted("dispatch"):
+        calls = 20000
+        runs = measure(lambda: [shell.dispatch(["pwd"]) for _ in range(calls)], repeat)
+        record("dispatch.builtin", runs, calls=calls, us_per_call=round(min(runs) / calls * 1e6, 2))
+    if wanted("main"):
+        lines = 5000
+        runs = [run_commands(script, ["pwd"] * lines, env) for _ in range(repeat)]
+        record("main.stdin_commands", runs, commands=lines)
+    if wanted("exec"):
+        calls = 200
+        true = shutil.which("true")
+        if true:
+            runs = measure(lambda: [shell.execute_command([true]) for _ in range(calls)], repeat)
+            record("exec.true", runs, calls=calls, ms_per_call=round(min(runs) / calls * 1e3, 3))
+    if wanted("startup") and hasattr(os, "fork"):
+        record("startup.first_prompt", time_to_prompt(script, env, repeat))
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(baseline, current):
+    """Print the median change of every benchmark present in both result files."""
+    print(f"{'benchmark':<48}{'baseline':>12}{'current':>12}{'change':>9}")
+    for script, results in current["results"].items():
+        for name, result in results.items():
+            old = baseline.get("results", {}).get(script, {}).get(name)
+            if old is None:
+                continue
+            change = (result["median"] - old["median"]) / old["median"] * 100 if old["median"] else 0.0
+            print(f"{script + ' ' + name:<48}{old['median'] * 1000:10.2f}ms{result['median'] * 1000:10.2f}ms"
+                  f"{change:+8.1f}%")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the shell scripts on synthetic workloads.")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "my_personal_shell_bench"),
+                        help="where the workload is generated (reused while its parameters match)")
+    parser.add_argument("--output", default="bench_results.json", help="JSON results file")
+    parser.add_argument("--compare", metavar="BASELINE", help="print the change against an earlier results file")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark")
+    parser.add_argument("--only", default="", help="comma-separated benchmark prefixes (find, ls, cat, "
+                                                   "dispatch, main, exec, startup)")
+    parser.add_argument("--scripts", default=",".join(SCRIPTS), help="comma-separated scripts to benchmark")
+    parser.add_argument("--wide", type=int, default=50000, help="files in the wide directory")
+    parser.add_argument("--depth", type=int, default=5, help="levels in the branching tree")
+    parser.add_argument("--fanout", type=int, default=6, help="subdirectories per tree directory")
+    parser.add_argument("--chain", type=int, default=200, help="levels in the deep directory chain")
+    parser.add_argument("--big-file-mb", type=int, default=2048, help="size of the large file for cat")
+    options = parser.parse_args(argv)
+
+    workdir = os.path.abspath(options.workdir)
+    params = generate_workload(workdir, options.wide, options.depth, options.fanout, options.chain,
+                               options.big_file_mb)
+    # Keep the shells' caches and history inside the workload directory so
+    # runs do not depend on (or disturb) the user's own.
+    os.environ["XDG_CACHE_HOME"] = os.path.join(workdir, "cache")
+    os.environ["SHELL_HISTFILE"] = os.path.join(workdir, "history")
+    shutil.rmtree(os.environ["XDG_CACHE_HOME"], ignore_errors=True)
+    env = dict(os.environ)
+    only = [prefix for prefix in options.only.split(",") if prefix]
+
+    report = {
+        "meta": {"commit": git_commit(), "date": datetime.now().isoformat(timespec="seconds"),
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "repeat": options.repeat},
+        "workload": params,
+        "results": {},
+    }
+    for script in options.scripts.split(","):
+        report["results"][script] = benchmark_script(script, workdir, params, options.repeat, only, env)
+
+    with open(options.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {options.output}", file=sys.stderr)
+    if options.compare:
+        with open(options.compare) as f:
+            compare(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
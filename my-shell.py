@@ -80,19 +80,21 @@ def install_package(package):
         print(f"An error occurred: {e}")
 
 def execute_command(command, use_sudo=False):
+    """Run an external command (a command line or argv list) attached to the terminal.
+
+    Returns the child's exit status.
+    """
     try:
-        args = shlex.split(command)
+        args = shlex.split(command) if isinstance(command, str) else list(command)
         if use_sudo:
             args = ["sudo"] + args
-        result = subprocess.run(args, check=False, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        if result.stdout:
-            print(result.stdout, end="")
-        if result.stderr:
-            print(result.stderr, end="")
+        return subprocess.run(args, check=False).returncode
     except FileNotFoundError:
-        print(f"Command not found: {command}")
+        print(f"Command not found: {args[0]}")
+        return 127
     except Exception as e:
         print(f"Error executing command: {e}")
+        return 1
 
 def find_files(name, path="."):
     results = []
@@ -114,9 +116,151 @@ def clear_screen():
 def echo(args):
     print(' '.join(args))
 
-def main():
-    history = []
+# Builtin registry: command name -> handler(args), where args is argv[1:].
+# Handlers may return an exit status; None counts as success.
+BUILTINS = {}
+history = []
+
+def register_builtin(name, handler):
+    """Register (or replace) the handler for a builtin command name."""
+    BUILTINS[name] = handler
+    return handler
+
+def builtin(*names):
+    """Decorator registering a function as the handler for one or more builtin names."""
+    def register(handler):
+        for name in names:
+            register_builtin(name, handler)
+        return handler
+    return register
+
+@builtin("exit", "quit")
+def exit_command(args):
+    print("Exiting shell...")
+    raise SystemExit(0)
+
+@builtin("echo")
+def echo_command(args):
+    echo(args)
+
+@builtin("clear")
+def clear_command(args):
+    clear_screen()
+
+@builtin("cd")
+def cd_command(args):
+    if not args:
+        print("cd: missing argument")
+        return 1
+    path = args[0]
+    try:
+        if path == "..":
+            os.chdir(os.path.dirname(os.getcwd()))
+        else:
+            os.chdir(path)
+    except FileNotFoundError:
+        print(f"cd: no such file or directory: {path}")
+        return 1
+    except Exception as e:
+        print(f"Error changing directory: {e}")
+        return 1
+
+@builtin("ls")
+def ls_command(args):
+    list_files(args[0] if args else ".")
+
+@builtin("pwd")
+def pwd_command(args):
+    print(os.getcwd())
+
+@builtin("mkdir")
+def mkdir_command(args):
+    if not args:
+        print("mkdir: missing directory name")
+        return 1
+    dir_name = args[0]
+    try:
+        os.mkdir(dir_name)
+        print(f"Directory '{dir_name}' created.")
+    except FileExistsError:
+        print(f"mkdir: cannot create directory '{dir_name}': File exists")
+        return 1
+    except Exception as e:
+        print(f"Error creating directory: {e}")
+        return 1
+
+@builtin("rmdir")
+def rmdir_command(args):
+    if not args:
+        print("rmdir: missing directory name")
+        return 1
+    dir_name = args[0]
+    try:
+        os.rmdir(dir_name)
+        print(f"Directory '{dir_name}' removed.")
+    except OSError as e:
+        print(f"rmdir: failed to remove '{dir_name}': {e}")
+        return 1
+
+@builtin("find")
+def find_command(args):
+    if not args:
+        print("find: missing search term")
+        return 1
+    name = args[0]
+    try:
+        results = find_files(name)
+        if results:
+            print("Found the following matches:")
+            for result in results:
+                print(result)
+        else:
+            print(f"No matches found for '{name}'")
+            return 1
+    except Exception as e:
+        print(f"Error during find operation: {e}")
+        return 1
+
+@builtin("help")
+def help_command(args):
+    print_help()
+
+@builtin("sysinfo")
+def sysinfo_command(args):
+    system_info()
+
+@builtin("timestamp")
+def timestamp_command(args):
+    print(datetime.now().isoformat())
+
+@builtin("history")
+def history_command(args):
+    for i, cmd in enumerate(history):
+        print(f"{i + 1}: {cmd}")
+
+@builtin("install")
+def install_command(args):
+    if not args:
+        print("install: missing package name")
+        return 1
+    try:
+        install_package(args[0])
+    except Exception as e:
+        print(f"Error during installation: {e}")
+        return 1
+
+@builtin("sudo")
+def sudo_command(args):
+    return execute_command(args, use_sudo=True)
 
+def dispatch(args):
+    """Run one parsed command: a registered builtin, else an external program."""
+    handler = BUILTINS.get(args[0])
+    if handler is None:
+        return execute_command(args)
+    return handler(args[1:]) or 0
+
+def main():
     while True:
         current_dir = os.getcwd()
         try:
@@ -126,125 +270,14 @@ def main():
             break
 
         history.append(command)
-        args = shlex.split(command)
-
-        if command.lower() in ["exit", "quit"]:
-            print("Exiting shell...")
-            break
-
-        if not args:
-            continue
-
-        if args[0].lower() in ["exit", "quit"]:
-            print("Exiting shell...")
-            break
-
-        if args[0] == "echo":
-            echo(args[1:])
-            continue
-
-        if command == "clear":
-            clear_screen()
-            continue
-
-        if command.startswith("cd"):
-            try:
-                path = shlex.split(command)[1]
-                if path == "..":
-                    os.chdir(os.path.dirname(current_dir))
-                else:
-                    os.chdir(path)
-            except IndexError:
-                print("cd: missing argument")
-            except FileNotFoundError:
-                print(f"cd: no such file or directory: {path}")
-            except Exception as e:
-                print(f"Error changing directory: {e}")
-            continue
-
-        if command == "ls":
-            list_files()
-            continue
-
-        if command == "pwd":
-            print(current_dir)
-            continue
-
-        if command.startswith("mkdir"):
-            try:
-                dir_name = shlex.split(command)[1]
-                os.mkdir(dir_name)
-                print(f"Directory '{dir_name}' created.")
-            except IndexError:
-                print("mkdir: missing directory name")
-            except FileExistsError:
-                print(f"mkdir: cannot create directory '{dir_name}': File exists")
-            except Exception as e:
-                print(f"Error creating directory: {e}")
-            continue
-
-        if command.startswith("rmdir"):
-            try:
-                dir_name = shlex.split(command)[1]
-                os.rmdir(dir_name)
-                print(f"Directory '{dir_name}' removed.")
-            except IndexError:
-                print("rmdir: missing directory name")
-            except OSError as e:
-                print(f"rmdir: failed to remove '{dir_name}': {e}")
-            except Exception as e:
-                print(f"Error removing directory: {e}")
-            continue
-
-        if command.startswith("find"):
-            try:
-                name = shlex.split(command)[1]
-                results = find_files(name)
-                if results:
-                    print("Found the following matches:")
-                    for result in results:
-                        print(result)
-                else:
-                    print(f"No matches found for '{name}'")
-            except IndexError:
-                print("find: missing search term")
-            except Exception as e:
-                print(f"Error during find operation: {e}")
-            continue
-
-        if command == "help":
-            print_help()
-            continue
-
-        if command == "sysinfo":
-            system_info()
-            continue
-
-        if command == "timestamp":
-            print(datetime.now().isoformat())
-            continue
-
-        if command == "history":
-            for i, cmd in enumerate(history):
-                print(f"{i + 1}: {cmd}")
-            continue
-
-        if command.startswith("install"):
-            try:
-                package = shlex.split(command)[1]
-                install_package(package)
-            except IndexError:
-                print("install: missing package name")
-            except Exception as e:
-                print(f"Error during installation: {e}")
-            continue
-
-        if command.startswith("sudo"):
-            sudo_command = command[5:].strip()
-            execute_command(sudo_command, use_sudo=True)
+        try:
+            args = shlex.split(command)
+        except ValueError as e:
+            print(f"Syntax error: {e}")
             continue
 
-        execute_command(command)
+        if args:
+            dispatch(args)
 
 if __name__ == "__main__":
     main()
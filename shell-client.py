@@ -0,0 +1,91 @@
+"""Thin client for a shell daemon started with `updated-shell.py --serve`.
+
+Takes the same arguments as updated-shell.py:
+
+    python shell-client.py -c "ls -l"
+    python shell-client.py setup.msh
+
+The command runs in a fresh session forked from the warm daemon, on this
+process's own stdin, stdout and stderr, so only this small script has to
+start up. Without a daemon it falls back to running updated-shell.py itself,
+as it does when the socket is not owned by the current user: the client
+hands over its environment and terminal, so it only talks to a daemon whose
+peer uid (and, for the /tmp fallback, whose 0700 directory) is its own.
+Only the standard library's os, sys, json, signal, socket, stat and struct
+are imported.
+"""
+import json
+import os
+import signal
+import socket
+import stat
+import struct
+import sys
+
+FALLBACK_DIR = os.path.join("/tmp", f"my_personal_shell-{os.getuid()}")
+
+def default_socket_path():
+    # Keep in step with default_socket_path() in updated-shell.py.
+    if os.environ.get("SHELL_SOCKET"):
+        return os.environ["SHELL_SOCKET"]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "my_personal_shell.sock")
+    return os.path.join(FALLBACK_DIR, "shell.sock")
+
+def is_private_dir(directory):
+    try:
+        st = os.lstat(directory)
+    except OSError:
+        return False
+    return stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid() and not st.st_mode & 0o077
+
+def peer_uid(conn):
+    # Keep in step with peer_uid() in updated-shell.py.
+    if hasattr(socket, "SO_PEERCRED"):
+        _, uid, _ = struct.unpack("3i", conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")))
+        return uid
+    if hasattr(socket, "LOCAL_PEERCRED"):
+        return struct.unpack_from("2I", conn.getsockopt(0, socket.LOCAL_PEERCRED, 76))[1]
+    return None
+
+def run_locally(argv):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "updated-shell.py")
+    os.execv(sys.executable, [sys.executable, script, *argv])
+
+def main(argv):
+    path = default_socket_path()
+    if os.path.dirname(path) == FALLBACK_DIR and not is_private_dir(FALLBACK_DIR):
+        run_locally(argv)
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(path)
+    except OSError:
+        run_locally(argv)
+    uid = peer_uid(conn)
+    if uid is not None and uid != os.getuid():
+        print(f"shell-client: {path} belongs to uid {uid}, not you; running locally", file=sys.stderr)
+        conn.close()
+        run_locally(argv)
+
+    request = {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}
+    socket.send_fds(conn, [json.dumps(request).encode()], [0, 1, 2])
+    replies = conn.makefile("rb")
+    session = json.loads(replies.readline())["pid"]
+
+    def forward(signum, frame):
+        try:
+            os.killpg(session, signum)
+        except ProcessLookupError:
+            pass
+    for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+        signal.signal(signum, forward)
+
+    line = replies.readline()
+    if not line:
+        print("shell-client: the daemon closed the session", file=sys.stderr)
+        return 1
+    return json.loads(line)["status"]
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,25 @@
+"""Use the shell as a library.
+
+    from shell_api import Shell
+
+    shell = Shell()
+    result = shell.run("ls -l")
+    for entry in result.data:
+        print(entry["name"], entry["size"])
+
+updated-shell.py is not an importable module name, so this loads it by path
+and re-exports its embedding API. Importing it does not start the REPL or
+touch the terminal.
+"""
+import importlib.util
+import os
+
+_spec = importlib.util.spec_from_file_location(
+    "updated_shell", os.path.join(os.path.dirname(os.path.abspath(__file__)), "updated-shell.py"))
+shell = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(shell)
+
+Shell = shell.Shell
+Result = shell.Result
+BUILTINS = shell.BUILTINS
+COLLECTORS = shell.COLLECTORS
@@ -0,0 +1,26 @@
+import importlib.util
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_script(script):
+    """Import a shell script (the file names are not valid module names) as a module."""
+    name = script.replace("-", "_").removesuffix(".py")
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, script))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture(scope="session")
+def shell():
+    """updated-shell.py as a module, with colors off so output can be compared."""
+    module = load_script("updated-shell.py")
+    module.disable_color()
+    return module
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+SHELL = os.path.join(ROOT, "updated-shell.py")
+
+def test_closed_stdout_exits_quietly(workdir):
+    for i in range(200):
+        (workdir / f"file{i:03}").write_text("")
+    process = subprocess.Popen([sys.executable, SHELL, "-c", "ls -R .\nls -R .\nls -R ."],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    process.stdout.readline()
+    process.stdout.close()
+    _, error = process.communicate(timeout=30)
+    assert (process.returncode, error) == (1, b"")
+
+def test_missing_script_is_127(workdir):
+    result = subprocess.run([sys.executable, SHELL, "missing.sh"], capture_output=True, text=True, timeout=30)
+    assert result.returncode == 127
+    assert result.stderr == "updated-shell.py: missing.sh: No such file or directory\n"
+
+def test_command_errors_keep_their_status(workdir):
+    result = subprocess.run([sys.executable, SHELL, "-c", "cat missing"], capture_output=True, text=True,
+                            timeout=30)
+    assert result.returncode == 1
@@ -0,0 +1,70 @@
+import errno
+import os
+import stat
+import threading
+
+import pytest
+
+def run_with_timeout(function, *args, timeout=10):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(function(*args)), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), f"{function.__name__} did not finish within {timeout}s"
+    return result[0]
+
+def test_copy_tree_copies_files_and_links(shell, workdir):
+    os.makedirs("src/sub")
+    (workdir / "src" / "sub" / "data.txt").write_text("hello")
+    os.symlink("sub/data.txt", "src/link")
+    os.chmod("src/sub/data.txt", 0o640)
+    files, size, errors = shell.copy_paths([("src", "dst")], recursive=True)
+    assert errors == []
+    assert (files, size) == (2, 5)
+    assert (workdir / "dst" / "sub" / "data.txt").read_text() == "hello"
+    assert stat.S_IMODE(os.stat("dst/sub/data.txt").st_mode) == 0o640
+    assert os.readlink("dst/link") == "sub/data.txt"
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs FIFOs")
+def test_copy_tree_recreates_fifo_instead_of_blocking(shell, workdir):
+    os.mkdir("src")
+    os.mkfifo("src/pipe")
+    (workdir / "src" / "file").write_text("x")
+    files, _, errors = run_with_timeout(shell.copy_paths, [("src", "dst")], True)
+    assert errors == []
+    assert files == 2
+    assert stat.S_ISFIFO(os.lstat("dst/pipe").st_mode)
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs FIFOs")
+def test_copy_fifo_argument_does_not_block(shell, workdir):
+    os.mkfifo("pipe")
+    files, _, errors = run_with_timeout(shell.copy_paths, [("pipe", "copy")])
+    assert errors == []
+    assert stat.S_ISFIFO(os.lstat("copy").st_mode)
+
+@pytest.fixture
+def cross_device(monkeypatch):
+    """Make every rename fail as it does between filesystems."""
+    def rename(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+    monkeypatch.setattr(os, "rename", rename)
+
+def test_move_across_filesystems_moves_symlink_not_target(shell, workdir, cross_device):
+    os.makedirs("target/sub")
+    (workdir / "target" / "sub" / "f").write_text("x")
+    os.symlink("target", "link")
+    renamed, files, _, errors = shell.move_paths([("link", "moved")])
+    assert errors == []
+    assert (renamed, files) == (0, 1)
+    assert os.readlink("moved") == "target"
+    assert not os.path.lexists("link")
+    assert os.path.isfile("target/sub/f")
+
+def test_move_across_filesystems_copies_then_removes_tree(shell, workdir, cross_device):
+    os.makedirs("src/sub")
+    (workdir / "src" / "sub" / "f").write_text("x")
+    renamed, files, _, errors = shell.move_paths([("src", "dst")])
+    assert errors == []
+    assert (renamed, files) == (0, 1)
+    assert (workdir / "dst" / "sub" / "f").read_text() == "x"
+    assert not os.path.exists("src")
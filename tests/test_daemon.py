@@ -0,0 +1,100 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import ROOT
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork") or not hasattr(os, "getuid"), reason="needs Unix sockets")
+
+@pytest.fixture
+def daemon(tmp_path):
+    socket_path = str(tmp_path / "shell.sock")
+    env = {**os.environ, "SHELL_SOCKET": socket_path, "SHELL_HISTFILE": str(tmp_path / "history")}
+    env.pop("SHELL_STATS", None)
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, "updated-shell.py"), "--serve"],
+                               env=env, stderr=subprocess.PIPE, text=True)
+    deadline = time.monotonic() + 10
+    while not os.path.exists(socket_path):
+        assert process.poll() is None, process.stderr.read()
+        assert time.monotonic() < deadline, "daemon did not start"
+        time.sleep(0.05)
+    yield env
+    process.terminate()
+    process.wait(10)
+
+def client(env, *args, **extra_env):
+    return subprocess.run([sys.executable, os.path.join(ROOT, "shell-client.py"), *args],
+                          env={**env, **extra_env}, capture_output=True, text=True, timeout=30)
+
+def test_client_runs_command_in_daemon(daemon, tmp_path):
+    result = client(daemon, "-c", "pwd")
+    assert result.returncode == 0
+    assert result.stdout.strip() == os.getcwd()
+
+def test_session_uses_client_environment_settings(daemon):
+    result = client(daemon, "-c", "stats", SHELL_STATS="1")
+    assert result.returncode == 0
+    assert "collection is off" not in result.stdout
+
+def test_client_exit_status_is_forwarded(daemon):
+    assert client(daemon, "-c", "exit 7").returncode == 7
+
+def test_reload_settings_follows_environment(shell, monkeypatch, tmp_path):
+    monkeypatch.setenv("SHELL_HISTSIZE", "50")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    try:
+        shell.reload_settings()
+        assert shell.HISTORY_SIZE == 50
+        assert shell.INDEX_DIR == os.path.join(str(tmp_path), "my_personal_shell", "index")
+    finally:
+        monkeypatch.undo()
+        shell.reload_settings()
+
+def test_peer_uid_is_own_uid_for_local_socket(shell):
+    import socket
+    left, right = socket.socketpair(socket.AF_UNIX)
+    with left, right:
+        assert shell.peer_uid(left) in (os.getuid(), None)
+
+@pytest.mark.parametrize("script", ["updated-shell.py", "shell-client.py"])
+def test_socket_directory_must_be_private(script, tmp_path):
+    from conftest import load_script
+    module = load_script(script)
+    is_private = getattr(module, "_is_private_dir", None) or module.is_private_dir
+    directory = tmp_path / "sockets"
+    directory.mkdir(0o700)
+    os.chmod(directory, 0o700)
+    assert is_private(str(directory))
+    os.chmod(directory, 0o755)
+    assert not is_private(str(directory))
+    os.symlink(directory, tmp_path / "link")
+    assert not is_private(str(tmp_path / "link"))
+
+@pytest.mark.skipif(not hasattr(os, "geteuid") or os.geteuid() != 0, reason="needs root to switch users")
+def test_daemon_rejects_other_users(daemon, tmp_path):
+    import socket
+    directory = tmp_path
+    while directory != directory.parent and str(directory).startswith(str(tmp_path.parent.parent)):
+        os.chmod(directory, 0o755)
+        directory = directory.parent
+    os.chmod(daemon["SHELL_SOCKET"], 0o777)
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.setuid(65534)
+            conn = socket.socket(socket.AF_UNIX)
+            conn.connect(daemon["SHELL_SOCKET"])
+            try:
+                request = {"argv": ["-c", "exit 0"], "cwd": "/", "env": {}}
+                socket.send_fds(conn, [json.dumps(request).encode()], [0, 1, 2])
+                os._exit(0 if conn.recv(100) == b"" else 1)
+            except (BrokenPipeError, ConnectionResetError):
+                os._exit(0)
+        finally:
+            os._exit(2)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
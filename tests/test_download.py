@@ -0,0 +1,75 @@
+import http.server
+import threading
+
+import pytest
+
+BODY = bytes(range(256)) * 4096 * 4
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """Serves BODY; the class attributes pick which server quirk to imitate."""
+    head_status = 200
+    ranges = True
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.requests.append(("HEAD", dict(self.headers)))
+        if self.head_status != 200:
+            self.send_error(self.head_status)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        if self.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+
+    def do_GET(self):
+        self.requests.append(("GET", dict(self.headers)))
+        byte_range = self.headers.get("Range")
+        if self.ranges and byte_range:
+            start, end = (int(n) for n in byte_range.removeprefix("bytes=").split("-"))
+            body = BODY[start:end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(BODY)}")
+        else:
+            body = BODY
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def server():
+    def serve(**quirks):
+        handler = type("QuirkyHandler", (Handler,), {**quirks, "requests": []})
+        httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+        return f"http://127.0.0.1:{httpd.server_port}/file", handler.requests
+    servers = []
+    yield serve
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+
+def test_head_rejected_falls_back_to_get(shell, server, workdir):
+    url, requests = server(head_status=405)
+    shell.download_file(url, "file", segments=4)
+    assert (workdir / "file").read_bytes() == BODY
+    assert [method for method, _ in requests] == ["HEAD", "GET"]
+
+def test_no_ranges_uses_one_get(shell, server, workdir):
+    url, requests = server(ranges=False)
+    shell.download_file(url, "file", segments=4)
+    assert (workdir / "file").read_bytes() == BODY
+    assert [method for method, _ in requests] == ["HEAD", "GET"]
+
+def test_segments_ask_for_identity_encoding(shell, server, workdir):
+    url, requests = server()
+    shell.download_file(url, "file", segments=4)
+    assert (workdir / "file").read_bytes() == BODY
+    ranged = [headers for method, headers in requests if "Range" in headers]
+    assert len(ranged) == 4
+    assert all(headers["Accept-Encoding"] == "identity" for headers in ranged)
@@ -0,0 +1,55 @@
+import pytest
+
+def words(shell, line):
+    return [str(word) for word in shell.expand_words(shell.tokenize(line))]
+
+@pytest.fixture
+def files(workdir):
+    for name in ("a1", "B2", "c_", "[z-a]", "]x", ".hidden"):
+        (workdir / name).write_text("")
+    (workdir / "sub").mkdir()
+    (workdir / "sub" / "a.py").write_text("")
+    return workdir
+
+def test_tokenize_quotes_and_operators(shell):
+    tokens = shell.tokenize("echo 'a b' \"c|d\" e\\ f | wc -l > out &")
+    assert tokens == ["echo", "a b", "c|d", "e f", "|", "wc", "-l", ">", "out", "&"]
+    assert [isinstance(token, shell.Operator) for token in tokens] == \
+        [False, False, False, False, True, False, False, True, False, True]
+
+def test_tokenize_unclosed_quote_is_value_error(shell):
+    with pytest.raises(ValueError):
+        shell.tokenize("echo 'unclosed")
+
+def test_braces(shell, workdir):
+    assert words(shell, "echo x{a,b}y {1..3} {a..c..2} {01..03}") == \
+        ["echo", "xay", "xby", "1", "2", "3", "a", "c", "01", "02", "03"]
+    assert words(shell, "echo {a,{b,c}}") == ["echo", "a", "b", "c"]
+    assert words(shell, "echo '{a,b}' {single}") == ["echo", "{a,b}", "{single}"]
+
+def test_glob_basics(shell, files):
+    assert words(shell, "echo ?1 sub/*.py") == ["echo", "a1", "sub/a.py"]
+    assert words(shell, "echo [a-c]?") == ["echo", "a1", "c_"]
+    assert words(shell, "echo [!a]?") == ["echo", "B2", "]x", "c_"]
+    assert words(shell, "echo *.nothing") == ["echo", "*.nothing"]
+
+def test_glob_character_classes(shell, files):
+    assert words(shell, "echo [[:alpha:]]?") == ["echo", "B2", "a1", "c_"]
+    assert words(shell, "echo [[:upper:]]*") == ["echo", "B2"]
+    assert words(shell, "echo ?[[:digit:]]") == ["echo", "B2", "a1"]
+    assert words(shell, "echo []]x") == ["echo", "]x"]
+
+@pytest.mark.parametrize("line", ["echo [z-a]", "echo [z-a", "echo [[:bogus:]]"])
+def test_invalid_bracket_matches_literally(shell, files, line):
+    assert words(shell, line) == line.split()
+
+def test_invalid_bracket_through_shell_api(shell, files):
+    result = shell.Shell(str(files)).run("echo [z-a]")
+    assert (result.status, result.data) == (0, "[z-a]")
+
+def test_unexpected_error_does_not_end_batch(shell, monkeypatch, capsys):
+    def broken(args):
+        raise RuntimeError("boom")
+    monkeypatch.setitem(shell.BUILTINS, "boom", broken)
+    assert shell.run_batch(["boom", "echo after"]) == 0
+    assert capsys.readouterr().out == "Error: boom\nafter\n"
@@ -0,0 +1,46 @@
+import shutil
+
+import pytest
+
+@pytest.fixture
+def tree(workdir):
+    (workdir / "a.txt").write_text("alpha\nbeta\ngamma\n")
+    (workdir / "sub").mkdir()
+    (workdir / "sub" / "b.txt").write_text("beta again\n")
+    return workdir
+
+def grep(shell, capfd, *args):
+    with open("/dev/null") as devnull:
+        stdin = shell.os.dup(0)
+        shell.os.dup2(devnull.fileno(), 0)
+        try:
+            status = shell.grep_command(list(args))
+        finally:
+            shell.os.dup2(stdin, 0)
+            shell.os.close(stdin)
+    return status, capfd.readouterr().out
+
+def test_single_file_prints_bare_lines(shell, tree, capfd):
+    assert grep(shell, capfd, "beta", "a.txt") == (0, "beta\n")
+
+def test_line_numbers_only_with_n(shell, tree, capfd):
+    assert grep(shell, capfd, "-n", "beta", "a.txt") == (0, "2:beta\n")
+
+def test_directories_prefix_the_path(shell, tree, capfd):
+    status, out = grep(shell, capfd, "-rn", "beta", ".")
+    assert status == 0
+    assert sorted(out.splitlines()) == ["./a.txt:2:beta", "./sub/b.txt:1:beta again"]
+
+def test_h_hides_the_path(shell, tree, capfd):
+    status, out = grep(shell, capfd, "-h", "beta", ".")
+    assert sorted(out.splitlines()) == ["beta", "beta again"]
+
+@pytest.mark.skipif(shutil.which("grep") is None, reason="needs the system grep")
+def test_unsupported_flags_run_system_grep(shell, tree, capfd):
+    assert grep(shell, capfd, "-v", "beta", "a.txt") == (0, "alpha\ngamma\n")
+    assert grep(shell, capfd, "-c", "beta", "a.txt") == (0, "1\n")
+    assert grep(shell, capfd, "--count", "nothing", "a.txt") == (1, "0\n")
+
+def test_collector_rejects_unsupported_flags(shell, tree):
+    with pytest.raises(ValueError):
+        shell._parse_grep_args(["-v", "beta", "a.txt"])
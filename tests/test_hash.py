@@ -0,0 +1,22 @@
+import os
+
+def test_hash_looks_up_names_on_path(shell, capsys):
+    shell.forget_command()
+    assert shell.hash_command(["ls"]) == 0
+    path, hits = shell._command_hash["ls"]
+    assert os.path.basename(path) == "ls"
+    assert hits == 0
+
+def test_hash_accepts_absolute_path(shell, capsys):
+    shell.forget_command()
+    assert shell.hash_command(["/bin/ls"]) == 0
+    assert "/bin/ls" not in shell._command_hash
+
+def test_hash_accepts_relative_path(shell, workdir, capsys):
+    shell.forget_command()
+    assert shell.hash_command(["./foo"]) == 0
+    assert "./foo" not in shell._command_hash
+
+def test_hash_reports_unknown_names(shell, capsys):
+    assert shell.hash_command(["no-such-command-xyz"]) == 1
+    assert "not found" in capsys.readouterr().out
@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+@pytest.fixture
+def histfile(shell, tmp_path, monkeypatch):
+    path = tmp_path / "history"
+    monkeypatch.setattr(shell, "HISTORY_FILE", str(path))
+    monkeypatch.setattr(shell, "HISTORY_SIZE", 10)
+    monkeypatch.setattr(shell, "HISTORY_SLACK", 5)
+    monkeypatch.setattr(shell, "history", [])
+    monkeypatch.setattr(shell, "_history_file", None)
+    yield path
+    if shell._history_file:
+        shell._history_file.close()
+
+def test_appends_survive_compaction_by_another_session(shell, histfile):
+    shell.add_history("before")
+    # Another session compacts the file: a new inode replaces the one we hold open.
+    temp = histfile.with_suffix(".tmp")
+    temp.write_text("compacted\n")
+    os.replace(temp, histfile)
+    shell.add_history("after")
+    assert histfile.read_text() == "compacted\nafter\n"
+
+def test_load_history_compacts_to_the_cap(shell, histfile):
+    histfile.write_text("".join(f"cmd{i}\n" for i in range(20)))
+    shell.load_history()
+    assert shell.history == [f"cmd{i}" for i in range(10, 20)]
+    assert histfile.read_text() == "".join(f"cmd{i}\n" for i in range(10, 20))
+    shell.add_history("next")
+    assert histfile.read_text().endswith("cmd19\nnext\n")
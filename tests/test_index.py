@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+@pytest.fixture
+def index_dir(shell, tmp_path, monkeypatch):
+    monkeypatch.setattr(shell, "INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr(shell, "_indexes", {})
+    return tmp_path / "index"
+
+def make_tree(root):
+    os.makedirs(root / "t" / "b")
+    (root / "t" / "b" / "one.txt").touch()
+
+def test_find_sees_files_created_after_index_build(shell, workdir, index_dir):
+    make_tree(workdir)
+    shell.build_index("t")
+    (workdir / "t" / "b" / "two.txt").touch()
+    assert list(shell.iter_find("two", "t")) == [os.path.join("t", "b", "two.txt")]
+
+def test_find_drops_files_removed_after_index_build(shell, workdir, index_dir):
+    make_tree(workdir)
+    shell.build_index("t")
+    os.remove(workdir / "t" / "b" / "one.txt")
+    assert list(shell.iter_find("one", "t")) == []
+
+def test_saved_index_is_revalidated_in_a_new_session(shell, workdir, index_dir, monkeypatch):
+    make_tree(workdir)
+    shell.build_index("t")
+    monkeypatch.setattr(shell, "_indexes", {})
+    os.mkdir(workdir / "t" / "new")
+    (workdir / "t" / "new" / "two.txt").touch()
+    assert list(shell.iter_find("two", "t")) == [os.path.join("t", "new", "two.txt")]
+
+def test_find_below_index_root_uses_index(shell, workdir, index_dir):
+    make_tree(workdir)
+    shell.build_index("t")
+    (workdir / "t" / "b" / "two.txt").touch()
+    assert list(shell.iter_find("two", os.path.join("t", "b"))) == [os.path.join("t", "b", "two.txt")]
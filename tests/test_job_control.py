@@ -0,0 +1,85 @@
+import os
+import select
+import sys
+import time
+
+import pytest
+
+from conftest import ROOT
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="needs a pseudo-terminal")
+
+class Terminal:
+    """The interactive shell running on a pseudo-terminal."""
+
+    def __init__(self, env):
+        import pty
+        self.pid, self.fd = pty.fork()
+        if self.pid == 0:
+            os.execve(sys.executable, [sys.executable, os.path.join(ROOT, "updated-shell.py")], env)
+        self.output = b""
+
+    def expect(self, text, timeout=10):
+        deadline = time.monotonic() + timeout
+        while text.encode() not in self.output:
+            remaining = deadline - time.monotonic()
+            ready, _, _ = select.select([self.fd], [], [], max(remaining, 0))
+            if not ready:
+                raise AssertionError(f"{text!r} not seen in {self.output.decode(errors='replace')!r}")
+            self.output += os.read(self.fd, 65536)
+
+    def send(self, data):
+        os.write(self.fd, data.encode())
+
+    def close(self):
+        os.close(self.fd)
+        try:
+            os.kill(self.pid, 9)
+        except ProcessLookupError:
+            pass
+        os.waitpid(self.pid, 0)
+
+@pytest.fixture
+def terminal(tmp_path):
+    terminals = []
+
+    def start(**env):
+        terminal = Terminal({**os.environ, "SHELL_HISTFILE": str(tmp_path / "history"), **env})
+        terminals.append(terminal)
+        terminal.expect("$ ")
+        return terminal
+    yield start
+    for terminal in terminals:
+        terminal.close()
+
+def test_ctrl_z_stops_colorized_child(terminal):
+    shell = terminal(SHELL_COLOR_CHILD_OUTPUT="1")
+    shell.send("sleep 30\n")
+    time.sleep(0.5)
+    shell.send("\x1a")
+    shell.expect("Stopped")
+    shell.send("echo alive\n")
+    shell.expect("alive\r\n")
+    shell.send("kill %1\n")
+
+def test_ctrl_z_stops_external_command(terminal):
+    shell = terminal()
+    shell.send("sleep 30\n")
+    time.sleep(0.5)
+    shell.send("\x1a")
+    shell.expect("Stopped")
+    shell.send("jobs\n")
+    shell.expect("sleep 30")
+    shell.send("kill %1\n")
+
+def test_run_foreground_returns_exit_status(shell):
+    assert shell.run_foreground(["true"]) == 0
+    assert shell.run_foreground(["false"]) == 1
+
+def test_without_wuntraced_popen_waits(shell, monkeypatch):
+    # As on Windows, where there are no stop notifications.
+    monkeypatch.delattr(os, "WUNTRACED")
+    job, process = shell.start_foreground(["sh", "-c", "exit 3"])
+    assert shell.wait_for_job(job) == 3
+    assert process.returncode == 3
+    assert shell.execute_command(["true"]) == 0
@@ -0,0 +1,28 @@
+def run(shell, capfd, *args):
+    status = shell.parallel_command(list(args))
+    return status, capfd.readouterr()
+
+def test_builtins_run_in_workers(shell, capfd):
+    status, captured = run(shell, capfd, "-k", "echo", "value", ":::", "a", "b", "c")
+    assert status == 0
+    assert captured.out == "value a\nvalue b\nvalue c\n"
+    assert captured.err.count("exit 0") == 3
+
+def test_failing_builtin_counts_as_failed(shell, workdir, capfd):
+    (workdir / "present").write_text("here\n")
+    status, captured = run(shell, capfd, "-k", "cat", ":::", "present", "missing")
+    assert status == 1
+    assert captured.out.startswith("here\n")
+    assert "exit 1" in captured.err
+
+def test_external_commands_still_run(shell, capfd):
+    status, captured = run(shell, capfd, "-k", "printf", "%s-", ":::", "x", "y")
+    assert status == 0
+    assert captured.out == "x-y-"
+
+def test_builtins_fail_cleanly_without_fork(shell, capfd, monkeypatch):
+    monkeypatch.delattr(shell.os, "fork")
+    status, captured = run(shell, capfd, "echo", ":::", "a", "b")
+    assert status == 2
+    assert captured.out.count("builtins cannot be parallel jobs on this platform") == 2
+    assert captured.err.count("exit 126") == 2
@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from test_copy import run_with_timeout
+
+@pytest.fixture
+def tree(workdir):
+    (workdir / "d" / "sub" / "deep").mkdir(parents=True)
+    (workdir / "d" / "top").write_text("x")
+    (workdir / "d" / "sub" / "file").write_text("x")
+    (workdir / "d" / "sub" / "deep" / "stuck").write_text("x")
+    return workdir
+
+def test_duplicate_roots(shell, tree):
+    files, directories, errors = run_with_timeout(shell.remove_paths, ["d", "d"], True)
+    assert (files, directories, errors) == (3, 3, [])
+    assert not (tree / "d").exists()
+
+@pytest.mark.parametrize("paths", [["d", "d/sub"], ["d/sub", "d"], ["d/sub/", "./d"]])
+def test_nested_roots(shell, tree, paths):
+    files, directories, errors = run_with_timeout(shell.remove_paths, paths, True)
+    assert (files, directories, errors) == (3, 3, [])
+    assert not (tree / "d").exists()
+
+def test_partial_failure_keeps_parents(shell, tree, monkeypatch):
+    unlink = os.unlink
+
+    def refuse_stuck(path, *args, **kwargs):
+        if os.path.basename(os.fspath(path)) == "stuck":
+            raise PermissionError(13, "Permission denied")
+        return unlink(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, "unlink", refuse_stuck)
+    files, directories, errors = run_with_timeout(shell.remove_paths, ["d"], True)
+    assert [path for path, _ in errors] == [os.path.join("d", "sub", "deep", "stuck")]
+    assert (files, directories) == (2, 0)
+    assert (tree / "d" / "sub" / "deep" / "stuck").exists()
+    assert not (tree / "d" / "top").exists()
+    assert not (tree / "d" / "sub" / "file").exists()
@@ -0,0 +1,45 @@
+def test_exit_returns_status_instead_of_exiting(shell, workdir):
+    result = shell.Shell(str(workdir)).run("exit 3")
+    assert result.status == 3
+    assert result.error is None
+
+def test_exit_with_bad_argument_returns_status_2(shell, workdir):
+    result = shell.Shell(str(workdir)).run("exit nope")
+    assert result.status == 2
+    assert "numeric argument required" in result.output
+
+def test_shell_keeps_working_after_exit(shell, workdir):
+    api = shell.Shell(str(workdir))
+    api.run("exit 1")
+    assert api.run("pwd").data == str(workdir)
+
+def test_cat_data_matches_builtin_output(shell, workdir, capfd):
+    (workdir / "a.txt").write_bytes(b"one\ntwo\n")
+    (workdir / "b.txt").write_bytes(b"three")
+    for command in ("cat a.txt b.txt", "cat -n a.txt b.txt"):
+        result = shell.Shell(str(workdir)).run(command)
+        assert result.status == 0
+        shell.run_line(command)
+        assert result.data.decode() == capfd.readouterr().out
+
+def test_cat_numbers_lines_across_files(shell, workdir):
+    (workdir / "a.txt").write_bytes(b"one\ntwo\n")
+    (workdir / "b.txt").write_bytes(b"three\n")
+    result = shell.Shell(str(workdir)).run("cat -n a.txt b.txt")
+    assert result.data == b"     1\tone\n     2\ttwo\n     3\tthree\n"
+
+def test_stderr_is_captured_without_colors(shell, workdir, capfd):
+    api = shell.Shell(str(workdir))
+    result = api.run("time pwd")
+    assert result.output == f"{workdir}\n"
+    assert "real\t" in result.stderr
+    result = api.run("parallel echo ::: 1")
+    assert result.output == "1\n"
+    assert result.stderr.startswith("[1/1] exit 0")
+    result = api.run("sh -c 'echo out; echo err >&2'")
+    assert (result.output, result.stderr) == ("out\n", "err\n")
+    assert capfd.readouterr() == ("", "")
+
+def test_own_stderr_redirection_wins(shell, workdir):
+    result = shell.Shell(str(workdir)).run("sh -c 'echo err >&2' 2>&1")
+    assert (result.output, result.stderr) == ("err\n", "")
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+@pytest.fixture
+def tree(workdir):
+    for i in range(30):
+        directory = workdir / f"d{i}" / "inner"
+        directory.mkdir(parents=True)
+        for j in range(40):
+            (directory / f"f{j}").write_text("")
+    (workdir / "d0" / ".git").mkdir()
+    (workdir / "d0" / ".git" / "config").write_text("")
+    os.symlink("d1", workdir / "link")
+    return workdir
+
+def expected(root, max_depth=None, exclude=()):
+    paths = set()
+    for directory, dirs, files in os.walk(root):
+        depth = os.path.relpath(directory, root).count(os.sep) + (directory != root)
+        if max_depth is not None and depth >= max_depth:
+            dirs[:] = []
+        dirs[:] = [d for d in dirs if d not in exclude]
+        paths.update(os.path.join(directory, name) for name in dirs + [f for f in files if f not in exclude])
+    return paths
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_walk_matches_os_walk(shell, tree, workers):
+    found = [entry.path for entry in shell.walk_tree(".", workers=workers)]
+    assert len(found) == len(set(found))
+    assert set(found) == expected(".") | {"./link"}
+
+def test_walk_exclude_and_depth(shell, tree):
+    assert {entry.path for entry in shell.walk_tree(".", exclude=(".git",))} == expected(".", exclude=(".git",)) | {"./link"}
+    assert {entry.path for entry in shell.walk_tree(".", max_depth=1)} == {f"./d{i}" for i in range(30)} | {"./link"}
+
+def test_walk_stops_early(shell, tree):
+    walker = shell.walk_tree(".")
+    first = next(walker)
+    walker.close()
+    assert first.path.startswith("./")
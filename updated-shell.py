@@ -1,167 +1,935 @@
+import time
+
+# --profile-startup reports how long each of these phases took.
+_startup_clock = time.perf_counter()
+_startup_phases = []
+
+def _startup_phase(name):
+    """Record the time spent since the previous phase ended."""
+    global _startup_clock
+    now = time.perf_counter()
+    _startup_phases.append((name, now - _startup_clock))
+    _startup_clock = now
+
 import os
 import subprocess
 import sys
 import shlex
 import platform
 import signal
-import time
+import errno
+import shutil
+import collections
+import stat
+import codecs
+import locale
+import threading
+import queue
+import re
+import fnmatch
+import bisect
+import hashlib
+import mmap
+import pickle
+import json
+from array import array
 from datetime import datetime
+_startup_phase("stdlib imports")
 from colorama import init, Fore, Back, Style
-import pkg_resources
-import requests
-from tqdm import tqdm
+_startup_phase("colorama import")
+# Heavier modules (requests, tqdm, concurrent.futures) are imported where they
+# are first needed so they do not delay the first prompt.
+
+# Settings read from the environment are registered here so that
+# reload_settings() can recompute them, in definition order, when the
+# environment changes (a daemon session adopting its client's environment).
+_env_settings = {}
+
+def env_setting(name, compute):
+    """Register the module setting `name` as compute() of the environment; return its value."""
+    _env_settings[name] = compute
+    return compute()
+
+def reload_settings():
+    """Recompute every env_setting from the current os.environ."""
+    for name, compute in _env_settings.items():
+        globals()[name] = compute()
 
 # Loading Bar
-def loading_bar(bard, bar_length=50, loading_time=8.0):
-    """Display a loading bar in the console."""
-    print(f"{Fore.CYAN}{bard}:{Style.RESET_ALL}")
-    steps = bar_length * 1
-    interval = loading_time / steps
+class ProgressBar:
+    """One-line progress display driven by real work.
+
+    With a total it draws a filled bar and percentage; without one it shows a
+    spinner, the number of steps seen so far and the latest status message.
+    Redraws are throttled to `interval` seconds and skipped entirely when
+    stdout is not a terminal, so updating the bar is nearly free.
+    """
     symbols = ['░', '▒', '▓', '█']
 
-    for step in range(steps + 1):
-        progress = step / steps
-        completed = int(progress * bar_length)
-        loading_bar = ""
-        for i in range(bar_length):
-            if i < completed - 1:
-                loading_bar += f"{Fore.CYAN}{symbols[-1]}{Style.RESET_ALL}"
-            elif i == completed - 1:
-                loading_bar += f"{Fore.GREEN}{symbols[step % len(symbols)]}{Style.RESET_ALL}"
-            else:
-                loading_bar += f"{Fore.GREEN}░{Style.RESET_ALL}"
-        
-        percentage = progress * 100
-        sys.stdout.write(f"\r{loading_bar}{Fore.RED}{percentage:5.1f}%{Style.RESET_ALL}")
-        sys.stdout.flush()
-        time.sleep(interval)
-    
-    final_bar = f"{Fore.GREEN}{symbols[-1] * bar_length}{Style.RESET_ALL}"
-    sys.stdout.write(f"\r{final_bar}{Fore.GREEN} 100.0%{Style.RESET_ALL}\n")
-    sys.stdout.flush()
+    def __init__(self, label, total=None, bar_length=50, interval=0.1):
+        self.label = label
+        self.total = total
+        self.bar_length = bar_length
+        self.interval = interval
+        self.count = 0
+        self.message = ""
+        self.enabled = sys.stdout.isatty()
+        self._last_draw = 0.0
+        self._width = shutil.get_terminal_size().columns
+        if self.enabled:
+            print(f"{Fore.CYAN}{label}:{Style.RESET_ALL}")
+
+    def update(self, advance=1, message=None):
+        self.count += advance
+        if message is not None:
+            self.message = message
+        if self.enabled and time.monotonic() - self._last_draw >= self.interval:
+            self._draw()
 
-# Initialize colorama for cross-platform color support
-init(autoreset=True)
+    def _draw(self):
+        self._last_draw = time.monotonic()
+        symbol = self.symbols[self.count % len(self.symbols)]
+        if self.total:
+            progress = min(self.count / self.total, 1.0)
+            completed = int(progress * self.bar_length)
+            bar = (f"{Fore.CYAN}{self.symbols[-1] * max(completed - 1, 0)}"
+                   f"{Fore.GREEN}{symbol if completed else ''}{'░' * (self.bar_length - completed)}"
+                   f"{Fore.RED}{progress * 100:5.1f}%")
+        else:
+            status = f" {self.count} lines  {self.message}"[:max(self._width - 4, 0)]
+            bar = f"{Fore.GREEN}{symbol}{Style.RESET_ALL}{status}\x1b[K"
+        sys.stdout.write(f"\r{bar}{Style.RESET_ALL}")
+        sys.stdout.flush()
 
-def signal_handler(sig, frame):
-    print(f"\n{Fore.RED}Exiting shell...{Style.RESET_ALL}")
-    sys.exit(0)
+    def close(self):
+        if not self.enabled:
+            return
+        if self.total:
+            self.count = self.total
+            sys.stdout.write(f"\r{Fore.GREEN}{self.symbols[-1] * self.bar_length} 100.0%{Style.RESET_ALL}\n")
+        else:
+            sys.stdout.write(f"\r{Fore.GREEN}{self.symbols[-1]}{Style.RESET_ALL} {self.count} lines\x1b[K\n")
+        sys.stdout.flush()
 
-signal.signal(signal.SIGINT, signal_handler)
+def loading_bar(bard, bar_length=50, loading_time=8.0):
+    """Animate a timed loading bar in the console."""
+    bar = ProgressBar(bard, total=bar_length, bar_length=bar_length, interval=0)
+    for _ in range(bar_length):
+        time.sleep(loading_time / bar_length)
+        bar.update()
+    bar.close()
 
-print(datetime.now().isoformat())
+# Per-user cache for the filename index and package index stamps.
+CACHE_DIR = env_setting("CACHE_DIR", lambda: os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "my_personal_shell"))
 
 def testo():
-    loading_bar("Deploying Warzone Assets", bar_length=50, loading_time=8.0)
+    # The animation is pure decoration, so scripts do not wait for it.
+    if sys.stdout.isatty():
+        loading_bar("Deploying Warzone Assets", bar_length=50, loading_time=8.0)
     print(f"{Fore.GREEN}Assets Deployed{Style.RESET_ALL}")    
 
-def list_files(path="."):
+# ls writes its output this many lines at a time.
+LS_BATCH_SIZE = 1000
+
+def scan_directory(path=".", show_all=False):
+    """Return the DirEntry objects in path, leaving out dotfiles unless show_all."""
+    with os.scandir(path) as it:
+        return [entry for entry in it if show_all or not entry.name.startswith(".")]
+
+def _sort_entries(entries, sort_by="name"):
+    """Sort by name, then (stably) by size or mtime, largest/newest first."""
+    entries.sort(key=lambda entry: entry.name)
+    if sort_by == "size":
+        entries.sort(key=lambda entry: entry.stat(follow_symlinks=False).st_size, reverse=True)
+    elif sort_by == "time":
+        entries.sort(key=lambda entry: entry.stat(follow_symlinks=False).st_mtime, reverse=True)
+
+def _long_prefix(st):
+    """Format the mode/size/mtime columns of `ls -l` for a stat result."""
+    mtime = time.strftime("%Y-%m-%d %H:%M", time.localtime(st.st_mtime))
+    return f"{stat.filemode(st.st_mode)} {st.st_size:>12} {mtime} "
+
+def _format_entry(entry, long_format):
+    color = Fore.BLUE if entry.is_dir() else Fore.GREEN
+    if not long_format:
+        return f"{color}{entry.name}{Style.RESET_ALL}\n"
     try:
-        for entry in os.listdir(path):
-            if os.path.isdir(os.path.join(path, entry)):
-                print(f"{Fore.BLUE}{entry}{Style.RESET_ALL}")
-            else:
-                print(f"{Fore.GREEN}{entry}{Style.RESET_ALL}")
+        prefix = _long_prefix(entry.stat(follow_symlinks=False))
+        target = f" -> {os.readlink(entry.path)}" if entry.is_symlink() else ""
+    except OSError:
+        prefix, target = f"{'?' * 10} {'?':>12} {'?' * 16} ", ""
+    return f"{prefix}{color}{entry.name}{Style.RESET_ALL}{target}\n"
+
+def list_files(path=".", show_all=False, long_format=False, sort_by="name", recursive=False):
+    """Print the entries of path in batches.
+
+    File types come from the scandir entries themselves; stat() is only called
+    when long_format or a size/time sort needs it.
+    """
+    try:
+        entries = scan_directory(path, show_all)
+        _sort_entries(entries, sort_by)
+    except NotADirectoryError:
+        prefix = _long_prefix(os.lstat(path)) if long_format else ""
+        print(f"{prefix}{Fore.GREEN}{path}{Style.RESET_ALL}")
+        return
     except Exception as e:
         print(f"{Fore.RED}Error listing files: {e}{Style.RESET_ALL}")
+        return 1
+
+    batch = []
+    for entry in entries:
+        batch.append(_format_entry(entry, long_format))
+        if len(batch) >= LS_BATCH_SIZE:
+            sys.stdout.write("".join(batch))
+            batch.clear()
+    sys.stdout.write("".join(batch))
+
+    status = 0
+    if recursive:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                print(f"\n{Fore.YELLOW}{entry.path}:{Style.RESET_ALL}")
+                status = list_files(entry.path, show_all, long_format, sort_by, recursive) or status
+    return status
 
 def print_help():
     print(f"{Fore.YELLOW}Shell commands:{Style.RESET_ALL}")
     help_commands = [
         ("cd <path>", "Change directory"),
         ("cd ..", "Go back to the previous directory"),
-        ("ls", "List files in the current directory"),
+        ("ls [-alStR] [path]", "List files (-a all, -l long, -S size, -t time, -R recursive)"),
         ("pwd", "Print current working directory"),
-        ("mkdir <dir>", "Create a new directory"),
-        ("rmdir <dir>", "Remove an empty directory"),
-        ("find <name>", "Search for files or directories"),
+        ("mkdir <dir>...", "Create a new directory"),
+        ("rmdir <dir>...", "Remove an empty directory"),
+        ("find <name> [path]", "Search for files or directories (-maxdepth N, -exclude GLOB, -type f|d|l)"),
+        ("grep [-iFwl] [-exclude GLOB] <regex> [path...]", "Search file contents in parallel, printing path:line:text as found"),
+        ("index build|status|drop", "Manage the filename index used by find"),
         ("cls/clear", "Clear the terminal screen"),
         ("help", "Display this help message"),
-        ("exit/quit", "Exit the shell"),
+        ("exit/quit [N]", "Exit the shell (with status N)"),
         ("sysinfo", "Display system information"),
         ("timestamp", "Print current timestamp"),
-        ("history", "Show command history"),
-        ("install <pkg>", "Install a package using the system's package manager"),
+        ("time <command>", "Run a command and report wall, user and sys time and max RSS"),
+        ("stats [on|off|reset|export [file]]", "Show per-command latency percentiles; export them as JSON Lines"),
+        ("history [N] / history search <term>", "Show or search the saved command history (!n, !!, !prefix recall)"),
+        ("hash [-r] [-d name] [name]", "Show, reset or fill the cached command paths"),
+        ("install [--refresh] <pkg>...", "Install packages in one transaction using the system's package manager"),
         ("sudo <command>", "Execute a command with sudo privileges"),
-        ("cat <file>", "Display content of a file"),
-        ("touch <file>", "Create an empty file"),
-        ("rm <file>", "Remove a file"),
-        ("vim <file>", "Edit a file with vim"),
-        ("devtool <tool>", "Install development tools (vim/mysql/vscode/git)")
+        ("cat [-n] <file>...", "Display file contents (-n numbers lines)"),
+        ("touch <file>...", "Create empty files"),
+        ("rm [-rf] <path>...", "Remove files (-r whole directory trees, in parallel; -f ignore missing)"),
+        ("cp [-r] [--progress] <src>... <dest>", "Copy files or trees (kernel-side copies, parallel across files, metadata kept)"),
+        ("mv [--progress] <src>... <dest>", "Move files; a rename on the same filesystem, copy and delete otherwise"),
+        ("vim <file>...", "Edit a file with vim"),
+        ("download [-j N] [--sha256 HEX] <url> [file]", "Download a file in parallel segments, resuming partial downloads"),
+        ("devtool <tool>...", "Install development tools (vim/mysql/vscode/git)"),
+        ("cmd | cmd > file", "Pipe and redirect output (|, >, >>, <, 2>&1)"),
+        ("cmd &", "Run a command line in the background"),
+        ("*.py src/**/*.c {a,b}", "Glob (*, ?, [...], **) and brace ({a,b}, {1..10}) expansion in arguments"),
+        ("parallel [-j N] [-k] <cmd> ::: args", "Run cmd once per arg (or stdin line) on N workers, output grouped per job"),
+        ("jobs / fg / bg [%n]", "List jobs, resume one in the foreground or background (Ctrl-Z stops)"),
+        ("wait [%n...]", "Wait for background jobs to finish"),
+        ("kill [-SIG] %n|pid", "Send a signal to a job or process")
     ]
     for cmd, desc in help_commands:
         print(f"  {Fore.CYAN}{cmd}{Style.RESET_ALL:<20} - {desc}")
 
+def system_details():
+    """Return the facts `sysinfo` prints, as a dict."""
+    return {
+        "system": platform.system(),
+        "release": platform.release(),
+        "version": platform.version(),
+        "architecture": platform.architecture()[0],
+        "processor": platform.processor(),
+        "python_version": platform.python_version(),
+    }
+
 def system_info():
-    print(f"{Fore.MAGENTA}System: {platform.system()}")
-    print(f"Release: {platform.release()}")
-    print(f"Version: {platform.version()}")
-    print(f"Architecture: {platform.architecture()[0]}")
-    print(f"Processor: {platform.processor()}")
-    print(f"Python Version: {platform.python_version()}{Style.RESET_ALL}")
+    details = system_details()
+    print(f"{Fore.MAGENTA}System: {details['system']}")
+    print(f"Release: {details['release']}")
+    print(f"Version: {details['version']}")
+    print(f"Architecture: {details['architecture']}")
+    print(f"Processor: {details['processor']}")
+    print(f"Python Version: {details['python_version']}{Style.RESET_ALL}")
+
+# Command hash table, like bash's `hash`: command name -> [absolute path, hits].
+# It is emptied whenever $PATH changes, and an entry whose file has gone away
+# is dropped and looked up again when running it fails.
+_command_hash = {}
+_command_hash_path = None
+_package_managers = {}
+
+def _current_path():
+    global _command_hash_path
+    path_env = os.environ.get("PATH", os.defpath)
+    if path_env != _command_hash_path:
+        _command_hash.clear()
+        _package_managers.clear()
+        _command_hash_path = path_env
+    return path_env
+
+def which(name):
+    """Return the absolute path of the executable `name` would run, or None."""
+    path_env = _current_path()
+    if os.sep in name or (os.altsep and os.altsep in name):
+        return name
+    entry = _command_hash.get(name)
+    if entry is None:
+        resolved = shutil.which(name, path=path_env)
+        if resolved is None:
+            return None
+        entry = _command_hash[name] = [os.path.abspath(resolved), 0]
+    entry[1] += 1
+    return entry[0]
+
+def forget_command(name=None):
+    """Drop one command (or, with no name, every command) from the hash table."""
+    if name is None:
+        _command_hash.clear()
+        _package_managers.clear()
+    else:
+        _command_hash.pop(name, None)
+
+def spawn(args, **kwargs):
+    """subprocess.Popen with argv[0] resolved through the command hash table."""
+    for attempt in range(2):
+        executable = which(args[0])
+        if executable is None:
+            raise FileNotFoundError(errno.ENOENT, "command not found", args[0])
+        # Batch runs block-buffer stdout; keep earlier output ahead of the child's.
+        sys.stdout.flush()
+        try:
+            return subprocess.Popen(args, executable=executable, **kwargs)
+        except FileNotFoundError:
+            if attempt:
+                raise
+            forget_command(args[0])
 
 def detect_package_manager():
+    """Return the first supported package manager on $PATH; memoized per $PATH."""
+    path_env = _current_path()
+    cached = _package_managers.get(path_env)
+    if cached is not None and (cached[1] is None or os.path.exists(cached[1])):
+        return cached[0]
+    manager = None
     if platform.system() == "Linux":
-        for manager in ["apt-get", "yum", "dnf", "pacman"]:
-            if subprocess.run(["which", manager], stdout=subprocess.PIPE, stderr=subprocess.PIPE).returncode == 0:
-                return manager
+        manager = next((m for m in ["apt-get", "yum", "dnf", "pacman"] if shutil.which(m, path=path_env)), None)
     elif platform.system() == "Darwin":
-        if subprocess.run(["which", "brew"], stdout=subprocess.PIPE, stderr=subprocess.PIPE).returncode == 0:
-            return "brew"
-    return None
+        manager = "brew" if shutil.which("brew", path=path_env) else None
+    _package_managers[path_env] = (manager, manager and shutil.which(manager, path=path_env))
+    return manager
 
-def install_package(package):
+def run_with_progress(args, label):
+    """Run a command, showing its output lines as progress on a terminal.
+
+    The bar advances once per line the command prints, so it costs nothing
+    extra when the command finishes quickly. On failure the last lines of
+    output are shown and CalledProcessError is raised. When stdout is not a
+    terminal the command simply writes to it directly.
+    """
+    if not sys.stdout.isatty():
+        returncode = run_foreground(args)
+        if returncode:
+            raise subprocess.CalledProcessError(returncode, args)
+        return
+    bar = ProgressBar(label)
+    tail = collections.deque(maxlen=20)
+    job, process = start_foreground(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                    errors="replace")
+
+    def follow():
+        with process.stdout:
+            for line in process.stdout:
+                line = line.rstrip()
+                tail.append(line)
+                bar.update(message=line)
+    # The output is read on a thread so a stopped (Ctrl-Z) command returns
+    # control to the shell instead of blocking the read.
+    reader = threading.Thread(target=follow, daemon=True)
+    reader.start()
+    returncode = wait_for_job(job)
+    if job.state != "Stopped":
+        reader.join()
+    bar.close()
+    if returncode:
+        for line in tail:
+            print(f"{Fore.RED}{line}{Style.RESET_ALL}")
+        raise subprocess.CalledProcessError(returncode, args)
+
+# Package manager -> (index refresh command, install command prefix). The
+# refresh is skipped while the stamp written after the last one is younger
+# than PACKAGE_INDEX_MAX_AGE seconds; brew refreshes itself on install.
+PACKAGE_MANAGER_COMMANDS = {
+    "apt-get": (["sudo", "apt-get", "update"], ["sudo", "apt-get", "install", "-y"]),
+    "yum": (["sudo", "yum", "makecache"], ["sudo", "yum", "install", "-y"]),
+    "dnf": (["sudo", "dnf", "makecache"], ["sudo", "dnf", "install", "-y"]),
+    "pacman": (["sudo", "pacman", "-Sy"], ["sudo", "pacman", "-S", "--noconfirm", "--needed"]),
+    "brew": (None, ["brew", "install"]),
+}
+PACKAGE_INDEX_MAX_AGE = env_setting("PACKAGE_INDEX_MAX_AGE",
+                                    lambda: float(os.environ.get("SHELL_PACKAGE_INDEX_MAX_AGE", "3600")))
+
+def _package_index_stamp(package_manager):
+    return os.path.join(CACHE_DIR, f"{package_manager}-index.stamp")
+
+def package_index_age(package_manager):
+    """Seconds since this shell last refreshed the package index, or None if never."""
+    try:
+        return time.time() - os.path.getmtime(_package_index_stamp(package_manager))
+    except OSError:
+        return None
+
+def refresh_package_index(package_manager, force=False):
+    """Refresh the package index unless the last refresh is recent enough."""
+    refresh = PACKAGE_MANAGER_COMMANDS[package_manager][0]
+    if refresh is None:
+        return
+    age = package_index_age(package_manager)
+    if not force and age is not None and age < PACKAGE_INDEX_MAX_AGE:
+        print(f"{Fore.YELLOW}Package index refreshed {age / 60:.0f} min ago; skipping update.{Style.RESET_ALL}")
+        return
+    run_with_progress(refresh, "Updating package index")
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(_package_index_stamp(package_manager), "a"):
+        os.utime(_package_index_stamp(package_manager), None)
+
+def install_packages(packages, force_refresh=False):
+    """Install several packages in a single package manager transaction; return a status."""
     package_manager = detect_package_manager()
     if not package_manager:
         print(f"{Fore.RED}No supported package manager found.{Style.RESET_ALL}")
-        return
+        return 1
+    if package_manager not in PACKAGE_MANAGER_COMMANDS:
+        print(f"{Fore.RED}Unsupported package manager: {package_manager}{Style.RESET_ALL}")
+        return 1
 
+    names = ", ".join(packages)
     try:
-        print(f"{Fore.YELLOW}Using {package_manager} to install {package}...{Style.RESET_ALL}")
-        if package_manager in ["apt-get", "yum", "dnf"]:
-            subprocess.run(["sudo", package_manager, "update"], check=True)
-            subprocess.run(["sudo", package_manager, "install", "-y", package], check=True)
-        elif package_manager == "pacman":
-            subprocess.run(["sudo", package_manager, "-Sy", package], check=True)
-        elif package_manager == "brew":
-            subprocess.run(["brew", "install", package], check=True)
-        else:
-            print(f"{Fore.RED}Unsupported package manager: {package_manager}{Style.RESET_ALL}")
-            return
-        print(f"{Fore.GREEN}Successfully installed {package}.{Style.RESET_ALL}")
+        print(f"{Fore.YELLOW}Using {package_manager} to install {names}...{Style.RESET_ALL}")
+        refresh_package_index(package_manager, force_refresh)
+        run_with_progress(PACKAGE_MANAGER_COMMANDS[package_manager][1] + list(packages), f"Installing {names}")
+        print(f"{Fore.GREEN}Successfully installed {names}.{Style.RESET_ALL}")
     except subprocess.CalledProcessError as e:
-        print(f"{Fore.RED}Failed to install {package}: {e}{Style.RESET_ALL}")
+        print(f"{Fore.RED}Failed to install {names}: {e}{Style.RESET_ALL}")
+        return 1
     except Exception as e:
         print(f"{Fore.RED}An error occurred: {e}{Style.RESET_ALL}")
+        return 1
+    return 0
 
-def execute_command(command, use_sudo=False):
+def install_package(package):
+    return install_packages([package])
+
+# Child output is passed straight through to the terminal unless coloring is
+# requested, in which case it is pumped through in chunks of this size.
+STREAM_CHUNK_SIZE = 64 * 1024
+COLOR_CHILD_OUTPUT = env_setting("COLOR_CHILD_OUTPUT", lambda: os.environ.get("SHELL_COLOR_CHILD_OUTPUT") == "1")
+
+def _pump_stream(pipe, color, lock):
+    """Copy a child's pipe to the terminal in bounded, colored chunks."""
+    decoder = codecs.getincrementaldecoder(locale.getpreferredencoding(False))(errors="replace")
+    fd = pipe.fileno()
+    try:
+        while True:
+            chunk = os.read(fd, STREAM_CHUNK_SIZE)
+            text = decoder.decode(chunk, final=not chunk)
+            if text:
+                with lock:
+                    sys.stdout.write(f"{color}{text}{Style.RESET_ALL}")
+                    sys.stdout.flush()
+            if not chunk:
+                break
+    finally:
+        pipe.close()
+
+def execute_command(command, use_sudo=False, colorize=None):
+    """Run an external command (a command line or argv list) and return its exit status.
+
+    The child inherits the terminal, so output appears as it is produced and
+    interactive programs work. With colorize (or SHELL_COLOR_CHILD_OUTPUT=1)
+    stdout/stderr are captured and streamed in STREAM_CHUNK_SIZE pieces, so
+    memory use stays flat however much the child prints.
+    """
+    if colorize is None:
+        colorize = COLOR_CHILD_OUTPUT
     try:
-        args = shlex.split(command)
+        args = shlex.split(command) if isinstance(command, str) else list(command)
         if use_sudo:
             args = ["sudo"] + args
-        result = subprocess.run(args, check=False, text=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        if result.stdout:
-            print(f"{Fore.GREEN}{result.stdout}{Style.RESET_ALL}", end="")
-        if result.stderr:
-            print(f"{Fore.RED}{result.stderr}{Style.RESET_ALL}", end="")
+        if not colorize:
+            return run_foreground(args)
+
+        job, process = start_foreground(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        lock = threading.Lock()
+        pumps = [
+            threading.Thread(target=_pump_stream, args=(process.stdout, Fore.GREEN, lock), daemon=True),
+            threading.Thread(target=_pump_stream, args=(process.stderr, Fore.RED, lock), daemon=True),
+        ]
+        for pump in pumps:
+            pump.start()
+        status = wait_for_job(job)
+        if job.state != "Stopped":
+            # A stopped job keeps its pumps, which resume with it.
+            for pump in pumps:
+                pump.join()
+        return status
     except FileNotFoundError:
-        print(f"{Fore.RED}Command not found: {command}{Style.RESET_ALL}")
+        print(f"{Fore.RED}Command not found: {args[0]}{Style.RESET_ALL}")
+        return 127
     except Exception as e:
         print(f"{Fore.RED}Error executing command: {e}{Style.RESET_ALL}")
+        return 1
+
+def thread_pool(max_workers):
+    """Create a ThreadPoolExecutor; concurrent.futures (and logging) load on first use."""
+    from concurrent.futures import ThreadPoolExecutor
+    return ThreadPoolExecutor(max_workers=max_workers)
 
-def find_files(name, path="."):
+# The walker is I/O bound, so it runs more threads than there are cores.
+FIND_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+WALK_BATCH_SIZE = 512
+
+def walk_tree(root=".", max_depth=None, exclude=(), workers=FIND_WORKERS):
+    """Yield os.DirEntry objects below root as a thread pool discovers them.
+
+    Each task walks its subtree depth-first with os.scandir and hands a
+    subdirectory to the pool only while a worker is idle, so a warm tree costs
+    about what a plain walk does and a slow one still fans out. Entries reach
+    the caller in lists of up to WALK_BATCH_SIZE, in no particular order.
+    Entries whose name matches one of the exclude globs are skipped together
+    with their subtree, and directories below max_depth (root's children are
+    depth 1) are not descended into. Symlinked directories are not followed.
+    """
+    excluded = re.compile("|".join(fnmatch.translate(p) for p in exclude)).match if exclude else None
+    results = queue.Queue(maxsize=64)
+    stop = threading.Event()
+    done = object()
+    pending = [1]
+    idle = [max(1, workers) - 1]
+    lock = threading.Lock()
+    executor = thread_pool(max(1, workers))
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def share(path, depth):
+        """Hand a directory to an idle worker; False when none is idle."""
+        with lock:
+            if not idle[0]:
+                return False
+            idle[0] -= 1
+            pending[0] += 1
+        try:
+            executor.submit(scan, path, depth)
+        except RuntimeError:
+            with lock:
+                idle[0] += 1
+                pending[0] -= 1
+            return False
+        return True
+
+    def scan(path, depth):
+        stack = [(path, depth)]
+        batch = []
+        try:
+            while stack and not stop.is_set():
+                path, depth = stack.pop()
+                descend = max_depth is None or depth < max_depth
+                try:
+                    with os.scandir(path) as it:
+                        for entry in it:
+                            if excluded and excluded(entry.name):
+                                continue
+                            batch.append(entry)
+                            if descend and entry.is_dir(follow_symlinks=False) and \
+                                    not (idle[0] and share(entry.path, depth + 1)):
+                                stack.append((entry.path, depth + 1))
+                except OSError:
+                    pass
+                if len(batch) >= WALK_BATCH_SIZE:
+                    put(batch)
+                    batch = []
+        finally:
+            if batch:
+                put(batch)
+            with lock:
+                idle[0] += 1
+                pending[0] -= 1
+                finished = pending[0] == 0
+            if finished:
+                put(done)
+
+    executor.submit(scan, root, 1)
+    try:
+        while True:
+            batch = results.get()
+            if batch is done:
+                return
+            yield from batch
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _entry_type(entry):
+    """Classify a DirEntry as "d", "f" or "l" without following symlinks."""
+    if entry.is_symlink():
+        return "l"
+    return "d" if entry.is_dir(follow_symlinks=False) else "f"
+
+def iter_find(name, path=".", max_depth=None, exclude=(), file_type=None, use_index=True):
+    """Yield matching paths below path as they are found.
+
+    Directories match when their name equals name, other entries when their
+    name contains it. file_type ("f", "d" or "l") restricts the kind of entry.
+    When an index covers path (see `index build`) it is used instead of
+    walking the tree.
+    """
+    index = _find_index(path) if use_index and name and "\n" not in name else None
+    if index is not None:
+        yield from _search_index(index, name, path, max_depth, exclude, file_type)
+        return
+    for entry in walk_tree(path, max_depth, exclude):
+        if file_type and _entry_type(entry) != file_type:
+            continue
+        if entry.name == name if entry.is_dir() else name in entry.name:
+            yield entry.path
+
+def find_files(name, path=".", **options):
     results = []
     try:
-        for root, dirs, files in os.walk(path):
-            if name in dirs:
-                results.append(os.path.join(root, name))
-            for file in files:
-                if name in file:
-                    results.append(os.path.join(root, file))
+        results.extend(iter_find(name, path, **options))
     except Exception as e:
         print(f"{Fore.RED}Error during search: {e}{Style.RESET_ALL}")
     return results
 
+# Content search
+# grep feeds the files found by walk_tree to a thread pool in batches of
+# GREP_BATCH_SIZE. Each worker runs one compiled bytes regex over a whole file,
+# so a file without matches costs a single scan in C and no per-line Python
+# work; line numbers are only counted up to the matches. Files of at least
+# GREP_MMAP_MIN bytes are mmapped rather than read, so large files are never
+# copied into memory; below that a plain read() is cheaper than setting up a
+# mapping. Results stream back as batches finish, with at most a few batches
+# per worker in flight. Options the builtin does not implement (-v, -c, -o,
+# long options, ...) hand the whole command line to the system grep.
+GREP_WORKERS = min(32, (os.cpu_count() or 1) * 2)
+GREP_EXCLUDE = (".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", ".tox")
+GREP_BINARY_PROBE = 8192
+GREP_MMAP_MIN = 256 * 1024
+GREP_BATCH_SIZE = 32
+GREP_FLAGS = "iFwlnrRhH"
+
+def grep_file(path, regex):
+    """Return [(line number, line), ...] for lines of path matching regex, or None for binary files."""
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        size = os.fstat(fd).st_size
+        if not size:
+            return []
+        if size < GREP_MMAP_MIN:
+            return _grep_buffer(os.read(fd, size), regex)
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as data:
+            return _grep_buffer(data, regex)
+    finally:
+        os.close(fd)
+
+def _grep_buffer(data, regex):
+    if b"\0" in data[:GREP_BINARY_PROBE]:
+        return None
+    matches = []
+    line, counted, pos, size = 1, 0, 0, len(data)
+    while pos < size:
+        match = regex.search(data, pos)
+        if match is None:
+            break
+        start = data.rfind(b"\n", 0, match.start()) + 1
+        end = data.find(b"\n", match.start())
+        if end < 0:
+            end = size
+        line += data[counted:start].count(b"\n")
+        counted = start
+        matches.append((line, data[start:end].rstrip(b"\r")))
+        pos = end + 1
+    return matches
+
+def _grep_targets(paths, exclude):
+    for path in paths:
+        if os.path.isdir(path):
+            for entry in walk_tree(path, exclude=exclude):
+                if entry.is_file(follow_symlinks=False):
+                    yield entry.path
+        else:
+            yield path
+
+def iter_grep(regex, paths, exclude=GREP_EXCLUDE, workers=GREP_WORKERS, errors=None):
+    """Yield (path, [(line number, line), ...]) for every file with matches, as files finish.
+
+    Directories are searched recursively, skipping entries whose name matches
+    an exclude glob; binary files are skipped. Files that cannot be read are
+    appended to errors as (path, error) when a list is given.
+    """
+    finished = queue.Queue()
+    limit = max(1, workers) * 4
+    in_flight = 0
+    executor = thread_pool(workers)
+
+    def search(batch):
+        found = []
+        for path in batch:
+            try:
+                matches = grep_file(path, regex)
+            except OSError as e:
+                if errors is not None:
+                    errors.append((path, e))
+                continue
+            if matches:
+                found.append((path, matches))
+        return found
+
+    try:
+        batch = []
+        for path in _grep_targets(paths, exclude):
+            batch.append(path)
+            if len(batch) < GREP_BATCH_SIZE:
+                continue
+            executor.submit(search, batch).add_done_callback(finished.put)
+            batch = []
+            in_flight += 1
+            while in_flight >= limit or (in_flight and not finished.empty()):
+                in_flight -= 1
+                yield from finished.get().result()
+        if batch:
+            executor.submit(search, batch).add_done_callback(finished.put)
+            in_flight += 1
+        while in_flight:
+            in_flight -= 1
+            yield from finished.get().result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# Filename index
+# `index build` records every directory below a root together with its mtime
+# and entry names. find answers from a flattened copy held in memory. Before
+# each lookup it stats the indexed directories below the searched path (a
+# stat is much cheaper than reading the directory) and rescans only those
+# whose mtime changed, so results are never stale. SHELL_INDEX_MAX_AGE > 0
+# skips that check for that many seconds after a refresh, trading accuracy
+# for speed on very large trees.
+INDEX_DIR = env_setting("INDEX_DIR", lambda: os.path.join(CACHE_DIR, "index"))
+INDEX_MAX_AGE = env_setting("INDEX_MAX_AGE", lambda: float(os.environ.get("SHELL_INDEX_MAX_AGE", "0")))
+_indexes = {}
+
+def _index_file(root):
+    digest = hashlib.sha1(root.encode("utf-8", "surrogateescape")).hexdigest()
+    return os.path.join(INDEX_DIR, f"{digest}.pickle")
+
+def _scan_dir(path):
+    """Return (mtime_ns, [(name, type, is_dir), ...]) for one directory, or None if unreadable."""
+    try:
+        # Stat before listing: a change made mid-scan leaves an older mtime
+        # behind, so the next refresh rescans the directory.
+        mtime = os.stat(path).st_mtime_ns
+        with os.scandir(path) as it:
+            return mtime, [(entry.name, _entry_type(entry), entry.is_dir()) for entry in it]
+    except OSError:
+        return None
+
+def _dir_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def _scan_subtrees(root, rel_dirs, dirs):
+    """Rescan rel_dirs into dirs, following new subdirectories level by level in parallel."""
+    removed = []
+    with thread_pool(FIND_WORKERS) as executor:
+        level = list(rel_dirs)
+        while level:
+            next_level = []
+            scans = executor.map(lambda rel: _scan_dir(os.path.join(root, rel)), level)
+            for rel, result in zip(level, scans):
+                old = dirs.pop(rel, None)
+                old_subdirs = {name for name, kind, _ in old[1] if kind == "d"} if old else set()
+                if result is None:
+                    removed.append(rel)
+                    continue
+                dirs[rel] = result
+                subdirs = {name for name, kind, _ in result[1] if kind == "d"}
+                for name in subdirs:
+                    child = os.path.join(rel, name) if rel else name
+                    if name not in old_subdirs or child not in dirs:
+                        next_level.append(child)
+                removed.extend(os.path.join(rel, name) if rel else name for name in old_subdirs - subdirs)
+            level = next_level
+    if removed:
+        prefixes = tuple(rel + os.sep for rel in removed)
+        for rel in [rel for rel in dirs if rel in removed or rel.startswith(prefixes)]:
+            del dirs[rel]
+
+def _save_index(index):
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    path = _index_file(index["root"])
+    header = {key: index[key] for key in ("root", "built", "refreshed")}
+    header["dirs"] = len(index["dirs"])
+    header["entries"] = sum(len(entries) for _, entries in index["dirs"].values())
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as file:
+        pickle.dump(header, file, pickle.HIGHEST_PROTOCOL)
+        pickle.dump(index["dirs"], file, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+def _load_index(root):
+    index = _indexes.get(root)
+    if index is not None:
+        return index
+    try:
+        with open(_index_file(root), "rb") as file:
+            header = pickle.load(file)
+            dirs = pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+    index = {"root": root, "built": header["built"], "refreshed": header["refreshed"],
+             "dirs": dirs, "view": None}
+    _indexes[root] = index
+    return index
+
+def build_index(path="."):
+    """Create or incrementally refresh the index rooted at path; return it."""
+    root = os.path.abspath(path)
+    index = _load_index(root)
+    if index is None:
+        now = time.time()
+        index = {"root": root, "built": now, "refreshed": now, "dirs": {}, "view": None}
+        _scan_subtrees(root, [""], index["dirs"])
+        _indexes[root] = index
+        _save_index(index)
+    else:
+        refresh_index(index)
+    return index
+
+def refresh_index(index, base=""):
+    """Rescan the directories (below base, relative to the root) whose mtime changed; return how many."""
+    root, dirs = index["root"], index["dirs"]
+    if base:
+        prefix = base + os.sep
+        rels = [rel for rel in dirs if rel == base or rel.startswith(prefix)]
+    else:
+        rels = list(dirs)
+    with thread_pool(FIND_WORKERS) as executor:
+        mtimes = executor.map(lambda rel: _dir_mtime(os.path.join(root, rel)), rels)
+        changed = [rel for rel, mtime in zip(rels, mtimes) if mtime != dirs[rel][0]]
+    if not base:
+        index["refreshed"] = time.time()
+    if changed:
+        _scan_subtrees(root, changed, dirs)
+        index["view"] = None
+        _save_index(index)
+    return len(changed)
+
+def drop_index(path="."):
+    """Delete the index rooted at path; return True if there was one."""
+    root = os.path.abspath(path)
+    _indexes.pop(root, None)
+    try:
+        os.remove(_index_file(root))
+        return True
+    except FileNotFoundError:
+        return False
+
+def list_indexes():
+    """Return the saved header (root, build times, counts) of every index on disk."""
+    headers = []
+    try:
+        names = sorted(os.listdir(INDEX_DIR))
+    except FileNotFoundError:
+        return headers
+    for name in names:
+        if not name.endswith(".pickle"):
+            continue
+        try:
+            with open(os.path.join(INDEX_DIR, name), "rb") as file:
+                header = pickle.load(file)
+            header["size"] = os.path.getsize(os.path.join(INDEX_DIR, name))
+            headers.append(header)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            continue
+    return headers
+
+def _find_index(path):
+    """Return the index covering path (rooted at it or an ancestor), revalidated below path."""
+    directory = os.path.abspath(path)
+    while True:
+        index = _load_index(directory)
+        if index is not None:
+            break
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+    if not INDEX_MAX_AGE or time.time() - index["refreshed"] > INDEX_MAX_AGE:
+        base = os.path.relpath(os.path.abspath(path), index["root"])
+        refresh_index(index, "" if base == os.curdir else base)
+    return index
+
+def _index_view(index):
+    """Flatten an index into one newline-joined name blob that str.find scans at C speed."""
+    view = index["view"]
+    if view is None:
+        names, parents, kinds, dir_flags = [], [], [], []
+        for rel, (_, entries) in index["dirs"].items():
+            for name, kind, is_dir in entries:
+                names.append(name)
+                parents.append(rel)
+                kinds.append(kind)
+                dir_flags.append(is_dir)
+        starts = array("q")
+        offset = 1
+        for name in names:
+            starts.append(offset)
+            offset += len(name) + 1
+        blob = "\n" + "\n".join(names) + "\n"
+        view = index["view"] = (blob, starts, names, parents, kinds, dir_flags)
+    return view
+
+def _search_index(index, name, path, max_depth, exclude, file_type):
+    """Yield the paths iter_find would report for name below path, using the index."""
+    blob, starts, names, parents, kinds, dir_flags = _index_view(index)
+    base = os.path.relpath(os.path.abspath(path), index["root"])
+    base = "" if base == os.curdir else base
+    prefix = base + os.sep if base else ""
+    excluded = re.compile("|".join(fnmatch.translate(p) for p in exclude)).match if exclude else None
+    position = blob.find(name)
+    while position != -1:
+        i = bisect.bisect_right(starts, position) - 1
+        entry = names[i]
+        if position + len(name) <= starts[i] + len(entry):
+            parent = parents[i]
+            if dir_flags[i] and entry != name:
+                pass
+            elif file_type and kinds[i] != file_type:
+                pass
+            elif parent == base or parent.startswith(prefix) or not base:
+                relative = os.path.join(parent, entry)[len(prefix):]
+                parts = relative.split(os.sep)
+                if (max_depth is None or len(parts) <= max_depth) and \
+                        not (excluded and any(excluded(part) for part in parts)):
+                    yield os.path.join(path, relative)
+        next_entry = i + 1
+        if next_entry >= len(starts):
+            break
+        position = blob.find(name, starts[next_entry])
+
 def clear_screen():
     """Clears the terminal screen."""
     os.system('clear' if platform.system() != 'Windows' else 'cls')
@@ -169,14 +937,93 @@ def clear_screen():
 def echo(args):
     print(' '.join(args))
 
-def cat_file(file_name):
+# cat moves data with sendfile when the kernel allows it and otherwise in
+# reads of this size, so memory use does not depend on the file size.
+CAT_BUFFER_SIZE = 1024 * 1024
+
+def _write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+def _copy_fd(src, dst):
+    """Copy src to dst until EOF, inside the kernel via os.sendfile when possible."""
+    if hasattr(os, "sendfile"):
+        try:
+            offset = os.lseek(src, 0, os.SEEK_CUR)
+        except OSError:
+            offset = None
+        if offset is not None:
+            try:
+                while True:
+                    sent = os.sendfile(dst, src, offset, CAT_BUFFER_SIZE * 16)
+                    if not sent:
+                        return
+                    offset += sent
+            except OSError as e:
+                # Not every descriptor pair supports sendfile (ttys, macOS
+                # non-sockets); carry on from where it stopped with plain reads.
+                if e.errno not in (errno.EINVAL, errno.ENOSYS, errno.ENOTSOCK, errno.EOPNOTSUPP):
+                    raise
+                os.lseek(src, offset, os.SEEK_SET)
+    while True:
+        chunk = os.read(src, CAT_BUFFER_SIZE)
+        if not chunk:
+            return
+        _write_all(dst, chunk)
+
+class LineNumberer:
+    """Prefix `cat -n` style line numbers onto byte chunks, carrying state across chunks and files."""
+
+    def __init__(self):
+        self.line = 1
+        self.at_line_start = True
+
+    def number(self, chunk):
+        out = []
+        lines = chunk.split(b"\n")
+        for i, line in enumerate(lines):
+            last = i == len(lines) - 1
+            if last and not line:
+                break
+            if self.at_line_start:
+                out.append(b"%6d\t" % self.line)
+                self.line += 1
+            out.append(line)
+            if not last:
+                out.append(b"\n")
+            self.at_line_start = not last
+        return b"".join(out)
+
+def cat_fd(fd, numberer=None):
+    """Stream everything readable from fd to stdout, bytes untouched unless numbering lines."""
+    sys.stdout.flush()
+    if numberer is None:
+        _copy_fd(fd, 1)
+        return
+    while True:
+        chunk = os.read(fd, CAT_BUFFER_SIZE)
+        if not chunk:
+            return
+        _write_all(1, numberer.number(chunk))
+
+def cat_file(file_name, numberer=None):
+    """Stream a file to stdout in constant memory; binary files are copied as-is."""
     try:
-        with open(file_name, 'r') as file:
-            print(file.read())
+        fd = os.open(file_name, os.O_RDONLY | getattr(os, "O_BINARY", 0))
     except FileNotFoundError:
         print(f"{Fore.RED}File not found: {file_name}{Style.RESET_ALL}")
+        return 1
+    except Exception as e:
+        print(f"{Fore.RED}Error reading file: {e}{Style.RESET_ALL}")
+        return 1
+    try:
+        cat_fd(fd, numberer)
     except Exception as e:
         print(f"{Fore.RED}Error reading file: {e}{Style.RESET_ALL}")
+        return 1
+    finally:
+        os.close(fd)
 
 def touch_file(file_name):
     try:
@@ -185,259 +1032,3167 @@ def touch_file(file_name):
         print(f"{Fore.GREEN}File {file_name} created or updated.{Style.RESET_ALL}")
     except Exception as e:
         print(f"{Fore.RED}Error creating file: {e}{Style.RESET_ALL}")
+        return 1
 
-def remove_file(file_name):
-    try:
-        os.remove(file_name)
-        print(f"{Fore.GREEN}File {file_name} removed.{Style.RESET_ALL}")
-    except FileNotFoundError:
-        print(f"{Fore.RED}File not found: {file_name}{Style.RESET_ALL}")
-    except Exception as e:
-        print(f"{Fore.RED}Error removing file: {e}{Style.RESET_ALL}")
+# rm -r deletes sibling subtrees concurrently on a thread pool (deletion is
+# metadata I/O, so like find it runs more threads than cores). Each directory
+# is opened once and its files are unlinked relative to that descriptor, so
+# the kernel does not re-resolve the full path for every file; a directory is
+# removed as soon as its last subdirectory is gone. Only the first few errors
+# are printed, followed by one summary line.
+REMOVE_WORKERS = FIND_WORKERS
+FILE_ERRORS_SHOWN = 10
+_DIR_FD_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_NOFOLLOW", 0)
+_UNLINK_AT = os.unlink in os.supports_dir_fd and os.scandir in os.supports_fd
 
-def edit_file(file_name):
-    try:
-        subprocess.call(['vim', file_name])
-    except FileNotFoundError:
-        print(f"{Fore.RED}Vim not found. Please install vim.{Style.RESET_ALL}")
-    except Exception as e:
-        print(f"{Fore.RED}Error editing file: {e}{Style.RESET_ALL}")
+def _outermost_roots(roots):
+    """Drop roots that repeat another root or lie inside one, as removing the outer tree covers them."""
+    real = [os.path.realpath(root) for root in roots]
+    kept = []
+    for i in sorted(range(len(roots)), key=lambda i: (len(real[i]), i)):
+        if not any(real[i] == real[j] or real[i].startswith(real[j].rstrip(os.sep) + os.sep) for j in kept):
+            kept.append(i)
+    return [roots[i] for i in sorted(kept)]
 
-def download_file(url, filename):
-    """Download a file from URL with progress bar."""
-    response = requests.get(url, stream=True)
-    total_size = int(response.headers.get('content-length', 0))
-    
-    with open(filename, 'wb') as file, tqdm(
-        desc=filename,
-        total=total_size,
-        unit='iB',
-        unit_scale=True,
-        unit_divisor=1024,
-    ) as pbar:
-        for data in response.iter_content(chunk_size=1024):
-            size = file.write(data)
-            pbar.update(size)
+def remove_paths(paths, recursive=False, force=False, workers=REMOVE_WORKERS):
+    """Remove files, and with recursive whole directory trees.
 
-def install_development_tool(tool_name):
-    """Install common development tools."""
-    system = platform.system().lower()
-    
-    tool_installers = {
-        'vim': {
-            'linux': lambda: execute_command('sudo apt-get install -y vim'),
-            'darwin': lambda: execute_command('brew install vim'),
-            'windows': lambda: print(f"{Fore.YELLOW}Please download Vim from: https://www.vim.org/download.php{Style.RESET_ALL}")
-        },
-        'mysql': {
-            'linux': lambda: execute_command('sudo apt-get install -y mysql-server'),
-            'darwin': lambda: execute_command('brew install mysql'),
-            'windows': lambda: print(f"{Fore.YELLOW}Please download MySQL from: https://dev.mysql.com/downloads/{Style.RESET_ALL}")
-        },
-        'vscode': {
-            'linux': lambda: execute_command('sudo snap install code --classic'),
-            'darwin': lambda: execute_command('brew install --cask visual-studio-code'),
-            'windows': lambda: print(f"{Fore.YELLOW}Please download VS Code from: https://code.visualstudio.com/download{Style.RESET_ALL}")
-        },
-        'git': {
-            'linux': lambda: execute_command('sudo apt-get install -y git'),
-            'darwin': lambda: execute_command('brew install git'),
-            'windows': lambda: print(f"{Fore.YELLOW}Please download Git from: https://git-scm.com/download/win{Style.RESET_ALL}")
-        }
-    }
+    Returns (files removed, directories removed, [(path, error), ...]). With
+    force, paths that do not exist are not errors. Symlinks are removed, never
+    followed.
+    """
+    counts = [0, 0]
+    errors = []
+    lock = threading.Lock()
+    roots = []
+    for path in paths:
+        try:
+            is_dir = stat.S_ISDIR(os.lstat(path).st_mode)
+        except FileNotFoundError as e:
+            if not force:
+                errors.append((path, e))
+            continue
+        except OSError as e:
+            errors.append((path, e))
+            continue
+        if is_dir:
+            if recursive:
+                roots.append(path)
+            else:
+                errors.append((path, IsADirectoryError(errno.EISDIR, "Is a directory")))
+            continue
+        try:
+            os.unlink(path)
+            counts[0] += 1
+        except FileNotFoundError as e:
+            if not force:
+                errors.append((path, e))
+        except OSError as e:
+            errors.append((path, e))
+    if not roots:
+        return counts[0], counts[1], errors
+    roots = _outermost_roots(roots)
 
-    if tool_name not in tool_installers:
-        print(f"{Fore.RED}Tool '{tool_name}' is not supported. Available tools: {', '.join(tool_installers.keys())}{Style.RESET_ALL}")
-        return
+    # directory -> [outstanding scans, parent, a descendant could not be removed]
+    pending = {root: [1, None, False] for root in roots}
+    left = [len(roots)]
+    done = threading.Event()
+    executor = thread_pool(workers)
 
-    try:
-        if system in tool_installers[tool_name]:
-            print(f"{Fore.CYAN}Installing {tool_name}...{Style.RESET_ALL}")
-            tool_installers[tool_name][system]()
-            print(f"{Fore.GREEN}{tool_name} installation completed!{Style.RESET_ALL}")
-        else:
-            print(f"{Fore.RED}Installation of {tool_name} is not supported on {system}{Style.RESET_ALL}")
-    except Exception as e:
-        print(f"{Fore.RED}Error installing {tool_name}: {e}{Style.RESET_ALL}")
+    def fail(path, error):
+        with lock:
+            errors.append((path, error))
 
-def main():
-    history = []
+    def release(path, failed=False):
+        # Drop one outstanding scan of path; the last one removes the directory.
+        while True:
+            with lock:
+                node = pending[path]
+                node[0] -= 1
+                node[2] = node[2] or failed
+                if node[0]:
+                    return
+                del pending[path]
+                parent, failed = node[1], node[2]
+            if not failed:
+                try:
+                    os.rmdir(path)
+                    with lock:
+                        counts[1] += 1
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    fail(path, e)
+                    failed = True
+            if parent is None:
+                with lock:
+                    left[0] -= 1
+                    if not left[0]:
+                        done.set()
+                return
+            path = parent
 
-    while True:
-        current_dir = os.getcwd()
+    def guarded(path):
+        # An unexpected error leaves the scan counts unreliable; record it and
+        # stop waiting rather than hang.
         try:
-            command = input(f"{Fore.CYAN}{current_dir} $ {Style.RESET_ALL}")
-        except EOFError:
-            print(f"\n{Fore.RED}Exiting shell...{Style.RESET_ALL}")
-            break
+            scan(path)
+        except Exception as e:
+            fail(path, e)
+            with lock:
+                left[0] = 0
+            done.set()
 
-        history.append(command)
-        args = shlex.split(command)
+    def scan(path):
+        removed = 0
+        failed = False
+        try:
+            fd = os.open(path, _DIR_FD_FLAGS) if _UNLINK_AT else None
+            try:
+                with os.scandir(path if fd is None else fd) as it:
+                    for entry in it:
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                        except OSError:
+                            is_dir = False
+                        if is_dir:
+                            child = os.path.join(path, entry.name)
+                            with lock:
+                                pending[child] = [1, path, False]
+                                pending[path][0] += 1
+                            executor.submit(guarded, child)
+                            continue
+                        try:
+                            os.unlink(entry.path, dir_fd=fd)
+                            removed += 1
+                        except FileNotFoundError:
+                            pass
+                        except OSError as e:
+                            fail(os.path.join(path, entry.name), e)
+                            failed = True
+            finally:
+                if fd is not None:
+                    os.close(fd)
+        except OSError as e:
+            fail(path, e)
+            failed = True
+        finally:
+            with lock:
+                counts[0] += removed
+            release(path, failed)
 
-        if command.lower() in ["exit", "quit"]:
-            print(f"{Fore.YELLOW}Exiting shell...{Style.RESET_ALL}")
-            break
+    try:
+        for root in roots:
+            executor.submit(guarded, root)
+        done.wait()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return counts[0], counts[1], errors
 
-        if not args:
-            continue
+def _plural(count, singular, plural=None):
+    return f"{count} {singular if count == 1 else plural or singular + 's'}"
 
-        if args[0].lower() in ["exit", "quit"]:
-            print(f"{Fore.YELLOW}Exiting shell...{Style.RESET_ALL}")
-            break
+# cp and mv copy file data inside the kernel: copy_file_range (which lets
+# filesystems that support it share extents instead of copying them), then
+# sendfile, then large read/write buffers as a last resort. A tree is created
+# directory by directory on the calling thread while a pool copies the files,
+# so many small files overlap their open/copy/close latency; at most a few
+# copies per worker are queued at a time, keeping memory flat on huge trees.
+# Mode, timestamps and extended attributes are preserved (shutil.copystat).
+COPY_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+COPY_CHUNK_SIZE = 1 << 30
+_COPY_FALLBACK_ERRNOS = {errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.EBADF, errno.ETXTBSY}
 
-        if args[0] == "echo":
-            echo(args[1:])
-            continue
+def _copy_file_data(src, dst, size):
+    """Copy src to dst from their current offsets, preferring os.copy_file_range."""
+    # Files such as those in /proc report size 0 but are not empty; they
+    # are only readable with read().
+    if size and hasattr(os, "copy_file_range"):
+        try:
+            while os.copy_file_range(src, dst, COPY_CHUNK_SIZE):
+                pass
+            return
+        except OSError as e:
+            if e.errno not in _COPY_FALLBACK_ERRNOS:
+                raise
+    _copy_fd(src, dst)
 
-        if command == "clear":
-            clear_screen()
-            continue
+def copy_file(src, dst, follow_symlinks=True):
+    """Copy one file's data and metadata to dst; return the number of bytes copied.
 
-        if command == "cls":
-            clear_screen()
-            continue
+    With follow_symlinks false a symlink is copied as a symlink. FIFOs,
+    sockets and device nodes are recreated with mknod rather than opened,
+    which for a FIFO would block until some other process wrote to it.
+    """
+    st = os.stat(src) if follow_symlinks else os.lstat(src)
+    if stat.S_ISLNK(st.st_mode):
+        os.symlink(os.readlink(src), dst)
+        return 0
+    if stat.S_ISDIR(st.st_mode):
+        raise IsADirectoryError(errno.EISDIR, "Is a directory")
+    if not stat.S_ISREG(st.st_mode):
+        if not hasattr(os, "mknod"):
+            raise OSError(errno.EOPNOTSUPP, "not a regular file")
+        os.mknod(dst, st.st_mode, st.st_rdev)
+        shutil.copystat(src, dst)
+        return 0
+    # O_NONBLOCK: should src be swapped for a FIFO after the stat above, the
+    # open must not block; the fstat below rejects it.
+    src_fd = os.open(src, os.O_RDONLY | getattr(os, "O_NONBLOCK", 0) | getattr(os, "O_BINARY", 0))
+    try:
+        st = os.fstat(src_fd)
+        if not stat.S_ISREG(st.st_mode):
+            raise OSError(errno.EINVAL, "changed while being copied")
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0),
+                         stat.S_IMODE(st.st_mode))
+        try:
+            _copy_file_data(src_fd, dst_fd, st.st_size)
+        finally:
+            os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+    shutil.copystat(src, dst)
+    return st.st_size
 
+def copy_paths(pairs, recursive=False, workers=COPY_WORKERS, progress=None):
+    """Copy each (source, destination) pair, with recursive whole directory trees.
 
-        if command.startswith("cd"):
-            try:
-                path = shlex.split(command)[1]
-                if path == "..":
-                    os.chdir(os.path.dirname(current_dir))
-                else:
-                    os.chdir(path)
-            except IndexError:
-                print(f"{Fore.RED}cd: missing argument{Style.RESET_ALL}")
-            except FileNotFoundError:
-                print(f"{Fore.RED}cd: no such file or directory: {path}{Style.RESET_ALL}")
-            except Exception as e:
-                print(f"{Fore.RED}Error changing directory: {e}{Style.RESET_ALL}")
-            continue
+    Symlinks inside a tree are copied as symlinks. progress, if given, is
+    called as progress(files, bytes) after every file. Returns (files copied,
+    bytes copied, [(path, error), ...]).
+    """
+    totals = [0, 0]
+    errors = []
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(workers * 4)
+    directories = []
+    executor = None
 
-        if command == "ls":
-            list_files()
-            continue
+    def fail(path, error):
+        with lock:
+            errors.append((path, error))
 
-        if command == "pwd":
-            print(current_dir)
-            continue
+    def copy_one(src, dst, follow_symlinks):
+        try:
+            size = copy_file(src, dst, follow_symlinks)
+        except OSError as e:
+            fail(src, e)
+            return
+        with lock:
+            totals[0] += 1
+            totals[1] += size
+            if progress:
+                progress(totals[0], totals[1])
+
+    def submit(src, dst):
+        slots.acquire()
+        try:
+            executor.submit(copy_one, src, dst, False).add_done_callback(lambda future: slots.release())
+        except BaseException:
+            slots.release()
+            raise
 
-        if command.startswith("mkdir"):
+    def copy_tree(root, target):
+        stack = [(root, target)]
+        while stack:
+            src, dst = stack.pop()
             try:
-                dir_name = shlex.split(command)[1]
-                os.mkdir(dir_name)
-                print(f"{Fore.GREEN}Directory '{dir_name}' created.{Style.RESET_ALL}")
-            except IndexError:
-                print(f"{Fore.RED}mkdir: missing directory name{Style.RESET_ALL}")
+                os.mkdir(dst)
             except FileExistsError:
-                print(f"{Fore.RED}mkdir: cannot create directory '{dir_name}': File exists{Style.RESET_ALL}")
-            except Exception as e:
-                print(f"{Fore.RED}Error creating directory: {e}{Style.RESET_ALL}")
-            continue
-
-        if command.startswith("rmdir"):
+                if not os.path.isdir(dst):
+                    fail(dst, FileExistsError(errno.EEXIST, "File exists"))
+                    continue
+            except OSError as e:
+                fail(dst, e)
+                continue
+            directories.append((src, dst))
             try:
-                dir_name = shlex.split(command)[1]
-                os.rmdir(dir_name)
-                print(f"{Fore.GREEN}Directory '{dir_name}' removed.{Style.RESET_ALL}")
-            except IndexError:
-                print(f"{Fore.RED}rmdir: missing directory name{Style.RESET_ALL}")
+                with os.scandir(src) as it:
+                    entries = list(it)
             except OSError as e:
-                print(f"{Fore.RED}rmdir: failed to remove '{dir_name}': {e}{Style.RESET_ALL}")
-            except Exception as e:
-                print(f"{Fore.RED}Error removing directory: {e}{Style.RESET_ALL}")
-            continue
+                fail(src, e)
+                continue
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    stack.append((entry.path, os.path.join(dst, entry.name)))
+                else:
+                    submit(entry.path, os.path.join(dst, entry.name))
 
-        if command.startswith("find"):
+    try:
+        for src, dst in pairs:
+            if os.path.isdir(src) and recursive:
+                real_src, real_dst = os.path.realpath(src), os.path.realpath(dst)
+                if real_dst == real_src or real_dst.startswith(real_src.rstrip(os.sep) + os.sep):
+                    errors.append((src, OSError(errno.EINVAL, f"cannot copy a directory into itself, '{dst}'")))
+                    continue
+                if executor is None:
+                    executor = thread_pool(workers)
+                copy_tree(src, dst)
+            elif os.path.isdir(src):
+                errors.append((src, IsADirectoryError(errno.EISDIR, "-r not specified; omitting directory")))
+            elif os.path.exists(dst) and os.path.samefile(src, dst):
+                errors.append((src, OSError(errno.EINVAL, f"'{src}' and '{dst}' are the same file")))
+            else:
+                copy_one(src, dst, True)
+    except BaseException:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    if executor is not None:
+        executor.shutdown(wait=True)
+    # Creating entries updates a directory's mtime, so directory metadata is
+    # copied last, deepest first.
+    for src, dst in reversed(directories):
+        try:
+            shutil.copystat(src, dst)
+        except OSError as e:
+            errors.append((dst, e))
+    return totals[0], totals[1], errors
+
+def move_paths(pairs, progress=None):
+    """Rename each (source, destination) pair, copying and deleting across filesystems.
+
+    Returns (paths renamed, files copied, bytes copied, [(path, error), ...]).
+    """
+    renamed = 0
+    copied = [0, 0]
+    errors = []
+    for src, dst in pairs:
+        try:
+            os.rename(src, dst)
+            renamed += 1
+            continue
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                errors.append((src, e))
+                continue
+        if os.path.islink(src):
+            # Move the link itself, not whatever it points to.
             try:
-                name = shlex.split(command)[1]
-                results = find_files(name)
-                if results:
-                    print(f"{Fore.YELLOW}Found the following matches:{Style.RESET_ALL}")
-                    for result in results:
-                        print(f"{Fore.BLUE}{result}{Style.RESET_ALL}")
-                else:
-                    print(f"{Fore.RED}No matches found for '{name}'{Style.RESET_ALL}")
-            except IndexError:
-                print(f"{Fore.RED}find: missing search term{Style.RESET_ALL}")
-            except Exception as e:
-                print(f"{Fore.RED}Error during find operation: {e}{Style.RESET_ALL}")
+                if os.path.lexists(dst) and not os.path.isdir(dst):
+                    os.unlink(dst)
+                copy_file(src, dst, follow_symlinks=False)
+                os.unlink(src)
+                copied[0] += 1
+            except OSError as e:
+                errors.append((src, e))
             continue
+        files, size, failed = copy_paths([(src, dst)], recursive=True, progress=progress)
+        copied[0] += files
+        copied[1] += size
+        errors.extend(failed)
+        if not failed:
+            errors.extend(remove_paths([src], recursive=True)[2])
+    return renamed, copied[0], copied[1], errors
 
-        if command == "help":
-            print_help()
-            continue
+def _format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
 
-        if command == "sysinfo":
-            system_info()
-            continue
+def _copy_progress():
+    """Return a progress(files, bytes) callback redrawing one line on stderr at most 5 times a second."""
+    started = time.monotonic()
+    shown = [started]
 
-        if command == "timestamp":
-            print(datetime.now().isoformat())
-            continue
+    def progress(files, size):
+        now = time.monotonic()
+        if now - shown[0] >= 0.2 and sys.stderr.isatty():
+            shown[0] = now
+            rate = size / (now - started)
+            print(f"\r{_plural(files, 'file')}, {_format_bytes(size)} ({_format_bytes(rate)}/s)",
+                  end="", file=sys.stderr, flush=True)
+    return progress
 
-        if command == "history":
-            for i, cmd in enumerate(history):
-                print(f"{i + 1}: {cmd}")
-            continue
+def edit_file(*file_names):
+    try:
+        return run_foreground(['vim', *file_names])
+    except FileNotFoundError:
+        print(f"{Fore.RED}Vim not found. Please install vim.{Style.RESET_ALL}")
+    except Exception as e:
+        print(f"{Fore.RED}Error editing file: {e}{Style.RESET_ALL}")
 
-        if command.startswith("install"):
-            loading_bar("Installing", bar_length=50, loading_time=5.0)
-            try:
-                package = shlex.split(command)[1]
-                install_package(package)
-            except IndexError:
-                print(f"{Fore.RED}install: missing package name{Style.RESET_ALL}")
-            except Exception as e:
-                print(f"{Fore.RED}Error during installation: {e}{Style.RESET_ALL}")
-            continue
+# Downloads are split into this many HTTP Range segments fetched concurrently,
+# each written in chunks of DOWNLOAD_CHUNK_SIZE. Progress is kept next to the
+# target as <file>.part plus <file>.part.json so an interrupted download
+# resumes where each segment stopped.
+DOWNLOAD_SEGMENTS = 4
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_TIMEOUT = 30
 
-        if command.startswith("sudo"):
-            sudo_command = command[5:].strip()
-            execute_command(sudo_command, use_sudo=True)
-            continue
+def _download_session(segments):
+    import requests
+    from requests.adapters import HTTPAdapter
 
-        if command.startswith("cat"):
-            try:
-                cat_file(shlex.split(command)[1])
-            except IndexError:
-                print(f"{Fore.RED}cat: missing file name{Style.RESET_ALL}")
-            continue
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(segments, 1))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
-        if command.startswith("touch"):
-            try:
-                touch_file(shlex.split(command)[1])
-            except IndexError:
-                print(f"{Fore.RED}touch: missing file name{Style.RESET_ALL}")
-            continue
+# Byte offsets only line up when every response carries the file as stored,
+# so the probe and the Range requests ask the server not to compress it.
+IDENTITY_ENCODING = {"Accept-Encoding": "identity"}
 
-        if command.startswith("rm"):
-            try:
-                remove_file(shlex.split(command)[1])
-            except IndexError:
-                print(f"{Fore.RED}rm: missing file name{Style.RESET_ALL}")
-            continue
+def _probe_download(session, url):
+    """HEAD the URL; None when the server refuses or fails it (a plain GET still may work)."""
+    import requests
 
-        if command.startswith("vim"):
-            try:
-                edit_file(shlex.split(command)[1])
-            except IndexError:
-                print(f"{Fore.RED}vim: missing file name{Style.RESET_ALL}")
-            continue
+    try:
+        head = session.head(url, allow_redirects=True, headers=IDENTITY_ENCODING,
+                            timeout=DOWNLOAD_TIMEOUT)
+    except requests.RequestException:
+        return None
+    if not head.ok or head.headers.get("content-encoding", "identity").lower() != "identity":
+        return None
+    return head
 
-        if command.startswith("testo"):
-            testo()
-            continue
+def _load_download_state(state_path, part_path, url, size, validator):
+    """Return the saved segment table if it still matches the remote file, else None."""
+    try:
+        with open(state_path) as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if (state.get("url"), state.get("size"), state.get("validator")) != (url, size, validator):
+        return None
+    if not os.path.exists(part_path) or os.path.getsize(part_path) != size:
+        return None
+    return state
+
+def _save_download_state(state_path, state):
+    tmp = f"{state_path}.tmp"
+    with open(tmp, "w") as file:
+        json.dump(state, file)
+    os.replace(tmp, state_path)
+
+def _fetch_segment(session, url, part_path, segment, advance, stop):
+    """Fetch bytes [start + done, end] of a segment into the .part file at their offset."""
+    start, end, done = segment
+    if start + done > end:
+        return
+    headers = {"Range": f"bytes={start + done}-{end}", **IDENTITY_ENCODING}
+    with session.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise OSError(f"server ignored the range request for bytes {start + done}-{end}")
+        with open(part_path, "r+b") as file:
+            file.seek(start + done)
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                if stop.is_set():
+                    return
+                file.write(chunk)
+                segment[2] += len(chunk)
+                advance(len(chunk))
+
+def file_digest(path, algorithm="sha256"):
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(DOWNLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def download_file(url, filename, segments=DOWNLOAD_SEGMENTS, checksum=None):
+    """Download a file from URL with progress bar.
+
+    When the server accepts byte ranges the file is fetched as `segments`
+    concurrent Range requests over one pooled session, and a partial download
+    left by an earlier attempt is resumed. A server that rejects HEAD or
+    does not advertise ranges gets one plain GET instead. checksum is an optional
+    "algorithm:hexdigest" (or bare sha256 hex digest) verified before the
+    file is moved into place. Raises OSError or requests exceptions on failure.
+    """
+    from tqdm import tqdm
+
+    part_path = f"{filename}.part"
+    state_path = f"{part_path}.json"
+    session = _download_session(segments)
+    with session:
+        head = _probe_download(session, url)
+        if head is None:
+            size, validator, ranged = 0, None, False
+        else:
+            url = head.url
+            size = int(head.headers.get("content-length", 0))
+            validator = head.headers.get("etag") or head.headers.get("last-modified")
+            ranged = size > 0 and head.headers.get("accept-ranges", "").lower() == "bytes"
 
-        if command.startswith("devtool"):
+        with tqdm(desc=filename, total=size or None, unit='iB', unit_scale=True, unit_divisor=1024) as pbar:
+            if not ranged:
+                with session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response, \
+                        open(part_path, "wb") as file:
+                    response.raise_for_status()
+                    if pbar.total is None and "content-encoding" not in response.headers:
+                        pbar.total = int(response.headers.get("content-length", 0)) or None
+                    for data in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        pbar.update(file.write(data))
+            else:
+                state = _load_download_state(state_path, part_path, url, size, validator)
+                if state is None:
+                    count = max(1, min(segments, size // DOWNLOAD_CHUNK_SIZE))
+                    bounds = [size * i // count for i in range(count + 1)]
+                    state = {"url": url, "size": size, "validator": validator,
+                             "segments": [[bounds[i], bounds[i + 1] - 1, 0] for i in range(count)]}
+                    with open(part_path, "wb") as file:
+                        file.truncate(size)
+                pbar.update(sum(done for _, _, done in state["segments"]))
+
+                stop = threading.Event()
+                lock = threading.Lock()
+                last_save = [time.monotonic()]
+
+                def advance(nbytes):
+                    with lock:
+                        pbar.update(nbytes)
+                        if time.monotonic() - last_save[0] >= 1.0:
+                            _save_download_state(state_path, state)
+                            last_save[0] = time.monotonic()
+
+                executor = thread_pool(len(state["segments"]))
+                try:
+                    futures = [executor.submit(_fetch_segment, session, url, part_path, segment, advance, stop)
+                               for segment in state["segments"]]
+                    for future in futures:
+                        future.result()
+                finally:
+                    stop.set()
+                    executor.shutdown(wait=True)
+                    with lock:
+                        _save_download_state(state_path, state)
+
+    if checksum:
+        algorithm, _, expected = checksum.rpartition(":")
+        actual = file_digest(part_path, algorithm or "sha256")
+        if actual != expected.lower():
+            os.remove(part_path)
+            if os.path.exists(state_path):
+                os.remove(state_path)
+            raise OSError(f"checksum mismatch for {filename}: expected {expected}, got {actual}")
+    os.replace(part_path, filename)
+    if os.path.exists(state_path):
+        os.remove(state_path)
+
+# Parallel jobs
+# `parallel` runs one command per input value on a thread pool. Each worker
+# owns one child at a time and captures its stdout and stderr into a single
+# buffer, which the calling thread writes out in one piece, so the output of
+# different jobs never interleaves. Builtins run in forked children, as in a
+# pipeline; a worker forks only while holding the output lock, so the child
+# never inherits a stdout or stderr lock held by the calling thread.
+PARALLEL_JOBS = os.cpu_count() or 1
+
+def _parallel_argv(template, value):
+    """Substitute value for every {} in template, or append it if there is none."""
+    if any("{}" in part for part in template):
+        return [part.replace("{}", value) for part in template]
+    return template + [value]
+
+def run_parallel(template, values, jobs=PARALLEL_JOBS, halt_on_error=False, keep_order=False):
+    """Run template once per value with at most `jobs` at a time; return the number of failed jobs.
+
+    Job output is written to stdout as one block per job, in completion order
+    (input order with keep_order), and each job's exit status is reported on
+    stderr. With halt_on_error no new job starts after one fails; jobs
+    already running are allowed to finish.
+    """
+    halted = threading.Event()
+    output_lock = threading.Lock()
+    running = set()
+
+    def run_builtin(argv):
+        if not hasattr(os, "fork"):
+            raise OSError(f"{argv[0]}: builtins cannot be parallel jobs on this platform")
+        read_fd, write_fd = os.pipe()
+        try:
+            devnull = os.open(os.devnull, os.O_RDONLY)
             try:
-                tool = shlex.split(command)[1]
-                install_development_tool(tool)
-            except IndexError:
-                print(f"{Fore.RED}devtool: missing tool name{Style.RESET_ALL}")
-                print(f"{Fore.YELLOW}Available tools: vim, mysql, vscode, git{Style.RESET_ALL}")
-            continue
+                with output_lock:
+                    pid = _fork_builtin(BUILTINS[argv[0]], argv[1:], {0: devnull, 1: write_fd, 2: write_fd},
+                                        [read_fd, write_fd, devnull])
+            finally:
+                os.close(devnull)
+        except OSError:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        running.add(pid)
+        try:
+            with open(read_fd, "rb") as pipe:
+                output = pipe.read()
+            _, raw = os.waitpid(pid, 0)
+        finally:
+            running.discard(pid)
+        return os.waitstatus_to_exitcode(raw), output
+
+    def run_job(argv):
+        if halted.is_set():
+            return None, b"", 0.0
+        started = time.perf_counter()
+        if argv[0] in BUILTINS:
+            try:
+                status, output = run_builtin(argv)
+            except OSError as e:
+                status, output = 126, f"Error executing command: {e}\n".encode()
+        else:
+            try:
+                process = spawn(argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            except FileNotFoundError:
+                status, output = 127, f"Command not found: {argv[0]}\n".encode()
+            except OSError as e:
+                status, output = 126, f"Error executing command: {e}\n".encode()
+            else:
+                running.add(process.pid)
+                try:
+                    output, _ = process.communicate()
+                finally:
+                    running.discard(process.pid)
+                status = process.returncode
+        if status and halt_on_error:
+            halted.set()
+        return status, output, time.perf_counter() - started
+
+    argvs = [_parallel_argv(template, value) for value in values]
+    # The jobs share the shell's process group and cannot be resumed one by
+    # one, so Ctrl-Z is ignored (SIG_IGN survives exec) instead of stopping
+    # them while the shell waits.
+    previous_tstp = signal.signal(signal.SIGTSTP, signal.SIG_IGN) if _job_control else None
+    try:
+        failed, skipped = _run_parallel_jobs(run_job, argvs, jobs, keep_order, halted, running, output_lock)
+    finally:
+        if previous_tstp is not None:
+            signal.signal(signal.SIGTSTP, previous_tstp)
+    if skipped:
+        print(f"{Fore.RED}parallel: halted after a failure; {skipped} jobs not started{Style.RESET_ALL}",
+              file=sys.stderr)
+    return failed
+
+def _run_parallel_jobs(run_job, argvs, jobs, keep_order, halted, running, output_lock):
+    """Run every argv on the pool, printing output as jobs finish; return (failed, skipped)."""
+    from concurrent.futures import as_completed
+    failed = skipped = done = 0
+    with thread_pool(max(1, jobs)) as pool:
+        futures = {pool.submit(run_job, argv): index for index, argv in enumerate(argvs)}
+        try:
+            for future in (futures if keep_order else as_completed(futures)):
+                status, output, elapsed = future.result()
+                if status is None:
+                    skipped += 1
+                    continue
+                done += 1
+                failed += status != 0
+                color = Fore.GREEN if status == 0 else Fore.RED
+                with output_lock:
+                    sys.stdout.flush()
+                    _write_all(1, output)
+                    print(f"{color}[{done}/{len(argvs)}] exit {status} ({elapsed:.2f}s): "
+                          f"{shlex.join(argvs[futures[future]])}{Style.RESET_ALL}", file=sys.stderr)
+        except KeyboardInterrupt:
+            halted.set()
+            for pid in list(running):
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            raise
+    return failed, skipped
+
+# Tool -> per-system installer. On Linux and macOS a string is a package name
+# that is batched into one install transaction and a list is a command run on
+# its own; on Windows the value is the download page to point the user to.
+DEVELOPMENT_TOOLS = {
+    'vim': {
+        'linux': 'vim',
+        'darwin': 'vim',
+        'windows': 'https://www.vim.org/download.php',
+    },
+    'mysql': {
+        'linux': 'mysql-server',
+        'darwin': 'mysql',
+        'windows': 'https://dev.mysql.com/downloads/',
+    },
+    'vscode': {
+        'linux': ['sudo', 'snap', 'install', 'code', '--classic'],
+        'darwin': ['brew', 'install', '--cask', 'visual-studio-code'],
+        'windows': 'https://code.visualstudio.com/download',
+    },
+    'git': {
+        'linux': 'git',
+        'darwin': 'git',
+        'windows': 'https://git-scm.com/download/win',
+    },
+}
+
+def install_development_tools(tool_names):
+    """Install common development tools, sending plain packages through one batched install."""
+    system = platform.system().lower()
+    unknown = [tool for tool in tool_names if tool not in DEVELOPMENT_TOOLS]
+    if unknown:
+        print(f"{Fore.RED}Tool '{', '.join(unknown)}' is not supported. Available tools: {', '.join(DEVELOPMENT_TOOLS.keys())}{Style.RESET_ALL}")
+        return 1
+
+    status = 0
+    packages, commands = [], []
+    for tool_name in tool_names:
+        installer = DEVELOPMENT_TOOLS[tool_name].get(system)
+        if installer is None:
+            print(f"{Fore.RED}Installation of {tool_name} is not supported on {system}{Style.RESET_ALL}")
+            status = 1
+        elif system == 'windows':
+            print(f"{Fore.YELLOW}Please download {tool_name} from: {installer}{Style.RESET_ALL}")
+        elif isinstance(installer, list):
+            commands.append((tool_name, installer))
+        else:
+            packages.append(installer)
+
+    try:
+        if packages:
+            status = install_packages(packages) or status
+        for tool_name, command in commands:
+            print(f"{Fore.CYAN}Installing {tool_name}...{Style.RESET_ALL}")
+            if execute_command(command):
+                status = 1
+            else:
+                print(f"{Fore.GREEN}{tool_name} installation completed!{Style.RESET_ALL}")
+    except Exception as e:
+        print(f"{Fore.RED}Error installing {', '.join(tool_names)}: {e}{Style.RESET_ALL}")
+        return 1
+    return status
+
+def install_development_tool(tool_name):
+    """Install common development tools."""
+    return install_development_tools([tool_name])
+
+# Command history
+# Entries are appended to HISTORY_FILE one line at a time as they are run, so
+# concurrent sessions interleave instead of overwriting each other. The file
+# is only rewritten (compacted to HISTORY_SIZE entries) once it has grown
+# well past the cap. Compaction replaces the file with a new one, so a session
+# that still has the old one open notices the inode change on its next
+# append and reopens the path; lines appended while the new file was being
+# written are carried over before it replaces the old one.
+HISTORY_FILE = env_setting("HISTORY_FILE", lambda: os.path.expanduser(
+    os.environ.get("SHELL_HISTFILE", "~/.my_personal_shell_history")))
+HISTORY_SIZE = env_setting("HISTORY_SIZE", lambda: int(os.environ.get("SHELL_HISTSIZE", "100000")))
+HISTORY_SLACK = env_setting("HISTORY_SLACK", lambda: max(HISTORY_SIZE // 10, 100))
+
+history = []
+_history_file = None
+# Search index: every entry lowercased and joined with newlines, plus the
+# offset at which each entry starts, so `history search` is a str.find scan
+# and a bisect per hit rather than a Python loop over every entry.
+_history_text = []
+_history_offsets = array("q")
+_history_text_length = 0
+
+def load_history():
+    """Read HISTORY_FILE into `history`, compacting the file if it is far over the cap."""
+    try:
+        with open(HISTORY_FILE, "rb") as f:
+            data = f.read()
+    except OSError:
+        data = b""
+    entries = data.decode("utf-8", errors="replace").splitlines()
+    if len(entries) > HISTORY_SIZE + HISTORY_SLACK:
+        entries = entries[-HISTORY_SIZE:]
+        temp = f"{HISTORY_FILE}.{os.getpid()}.tmp"
+        try:
+            with open(temp, "wb") as f:
+                f.write(("\n".join(entries) + "\n").encode("utf-8"))
+                with open(HISTORY_FILE, "rb") as current:
+                    current.seek(len(data))
+                    f.write(current.read())
+            os.replace(temp, HISTORY_FILE)
+        except OSError as e:
+            print(f"{Fore.RED}history: could not compact {HISTORY_FILE}: {e}{Style.RESET_ALL}")
+    history[:] = entries[-HISTORY_SIZE:]
+    _reset_history_index()
+
+def _same_file(file, path):
+    """True if the open file is still the one at path."""
+    try:
+        opened, current = os.fstat(file.fileno()), os.stat(path)
+    except OSError:
+        return False
+    return (opened.st_dev, opened.st_ino) == (current.st_dev, current.st_ino)
+
+def add_history(command):
+    """Record a command in memory and append it to HISTORY_FILE."""
+    global _history_file
+    history.append(command)
+    if len(history) > HISTORY_SIZE + HISTORY_SLACK:
+        del history[:len(history) - HISTORY_SIZE]
+        _reset_history_index()
+    if _history_file and not _same_file(_history_file, HISTORY_FILE):
+        # Compacted (or moved) by another session since we opened it.
+        _history_file.close()
+        _history_file = None
+    if _history_file is None:
+        try:
+            _history_file = open(HISTORY_FILE, "a", encoding="utf-8", buffering=1)
+        except OSError:
+            _history_file = False
+    if _history_file:
+        try:
+            _history_file.write(command + "\n")
+        except OSError:
+            pass
+
+def _reset_history_index():
+    global _history_text_length
+    _history_text.clear()
+    _history_offsets[:] = array("q")
+    _history_text_length = 0
+
+def _history_index():
+    """Bring the search index up to date with `history` and return its text."""
+    global _history_text_length
+    new = history[len(_history_offsets):]
+    if new:
+        for command in new:
+            _history_offsets.append(_history_text_length)
+            _history_text_length += len(command) + 1
+        _history_text.append("\n".join(command.lower() for command in new) + "\n")
+        if len(_history_text) > 1:
+            _history_text[:] = ["".join(_history_text)]
+    return _history_text[0] if _history_text else ""
+
+def search_history(term):
+    """Yield (number, command) for entries containing term, case-insensitively, oldest first."""
+    text = _history_index()
+    term = term.lower()
+    last = -1
+    start = text.find(term)
+    while start >= 0:
+        index = bisect.bisect_right(_history_offsets, start) - 1
+        if index != last:
+            yield index + 1, history[index]
+            last = index
+        # Skip to the next entry: one hit per entry is enough.
+        start = text.find(term, _history_offsets[index + 1] if index + 1 < len(_history_offsets) else len(text))
+
+def expand_history(command):
+    """Expand a leading `!!`, `!n`, `!-n` or `!prefix` event; raise ValueError if none matches."""
+    if not command.startswith("!") or len(command) == 1 or command[1] in " \t=(":
+        return command
+    word, _, rest = command.partition(" ")
+    event = word[1:]
+    entry = None
+    if event == "!":
+        entry = history[-1] if history else None
+    elif event.lstrip("-").isdigit():
+        number = int(event)
+        index = number - 1 if number > 0 else len(history) + number
+        if 0 <= index < len(history):
+            entry = history[index]
+    else:
+        entry = next((cmd for cmd in reversed(history) if cmd.startswith(event)), None)
+    if entry is None:
+        raise ValueError(f"{word}: event not found")
+    return f"{entry} {rest}" if rest else entry
+
+def init_readline():
+    """Enable line editing, Ctrl-R reverse search and Tab completion when readline is available."""
+    try:
+        import readline
+    except ImportError:
+        return None
+    # read_history_file is far cheaper than add_history per entry; the file
+    # was just compacted, so it holds at most HISTORY_SIZE + HISTORY_SLACK.
+    readline.clear_history()
+    try:
+        readline.read_history_file(HISTORY_FILE)
+    except OSError:
+        pass
+    readline.set_completer_delims(" \t\n|<>&")
+    readline.set_completer(complete)
+    if "libedit" in (readline.__doc__ or ""):
+        readline.parse_and_bind("bind ^I rl_complete")
+    else:
+        readline.parse_and_bind("tab: complete")
+    return readline
+
+# Tab completion
+# Directory listings are cached per directory and reused until the
+# directory's mtime changes, so repeated Tabs in a large directory or over a
+# long $PATH cost one stat per directory instead of a rescan. Glob expansion
+# shares the cache. It holds up to LISTING_CACHE_ENTRIES names in total,
+# dropping the oldest directories first.
+LISTING_CACHE_ENTRIES = 500000
+_listings = {}
+_listing_entries = 0
+_path_executables = ((), [])
+_completion_matches = []
+
+def cached_listing(directory):
+    """Return the sorted entry names of directory (directories end in "/"), cached by mtime."""
+    return _cached_scan(directory)[0]
+
+def _cached_scan(directory):
+    """Return (sorted names, names that are symlinks) for directory, cached by mtime."""
+    global _listing_entries
+    try:
+        mtime = os.stat(directory).st_mtime_ns
+    except OSError:
+        return [], frozenset()
+    cached = _listings.get(directory)
+    if cached is not None and cached[0] == mtime:
+        return cached[1], cached[2]
+    names = []
+    links = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                name = entry.name + "/" if is_dir else entry.name
+                names.append(name)
+                if entry.is_symlink():
+                    links.append(name)
+    except OSError:
+        return [], frozenset()
+    names.sort()
+    if cached is not None:
+        _listing_entries -= len(_listings.pop(directory)[1])
+    while _listings and _listing_entries + len(names) > LISTING_CACHE_ENTRIES:
+        _listing_entries -= len(_listings.pop(next(iter(_listings)))[1])
+    _listings[directory] = (mtime, names, frozenset(links))
+    _listing_entries += len(names)
+    return names, _listings[directory][2]
+
+def path_executables():
+    """Return the sorted names of executables on $PATH, rebuilt only when a $PATH directory changes."""
+    global _path_executables
+    key = []
+    for directory in _current_path().split(os.pathsep):
+        try:
+            key.append((directory, os.stat(directory or ".").st_mtime_ns))
+        except OSError:
+            pass
+    key = tuple(key)
+    if _path_executables[0] != key:
+        names = set()
+        for directory, _ in key:
+            for name in cached_listing(directory or "."):
+                if not name.endswith("/") and name not in names and \
+                        os.access(os.path.join(directory, name), os.X_OK):
+                    names.add(name)
+        _path_executables = (key, sorted(names))
+    return _path_executables[1]
+
+def _prefixed(sorted_names, prefix):
+    """Yield the names in sorted_names starting with prefix, found by bisection."""
+    for i in range(bisect.bisect_left(sorted_names, prefix), len(sorted_names)):
+        if not sorted_names[i].startswith(prefix):
+            break
+        yield sorted_names[i]
+
+def completions(text, line_before):
+    """Return completions for the word text, given the line up to that word."""
+    words = line_before.split()
+    command_position = not line_before.strip() or line_before.rstrip()[-1] in "|&" or \
+        (len(words) == 1 and words[0] in ("sudo", "time"))
+    if command_position and "/" not in text:
+        names = set(_prefixed(sorted(BUILTINS), text)) | set(_prefixed(path_executables(), text))
+        return [name + " " for name in sorted(names)]
+    head, _, prefix = text.rpartition("/")
+    if text.startswith("/") and not head:
+        head = "/"
+    directory = os.path.expanduser(head) if head else "."
+    head = text[:len(text) - len(prefix)]
+    return [head + name if name.endswith("/") else head + name + " "
+            for name in _prefixed(cached_listing(directory), prefix)
+            if prefix.startswith(".") or not name.startswith(".")]
+
+def complete(text, state):
+    """readline completer: compute the matches on the first call, then hand them out."""
+    global _completion_matches
+    if state == 0:
+        import readline
+        line = readline.get_line_buffer()
+        try:
+            _completion_matches = completions(text, line[:readline.get_begidx()])
+        except Exception:
+            _completion_matches = []
+    return _completion_matches[state] if state < len(_completion_matches) else None
+
+# Command timing
+# Resource usage comes from getrusage: RUSAGE_SELF covers builtins (which run
+# in this process) and RUSAGE_CHILDREN covers every child reaped so far, so the
+# difference around a command is what that command cost. Max RSS is a
+# high-water mark, not a delta.
+STATS_ENABLED = env_setting("STATS_ENABLED", lambda: os.environ.get("SHELL_STATS") == "1")
+# Histogram bucket upper bounds in seconds, and a label for each bucket.
+STATS_BUCKETS = [0.001, 0.01, 0.1, 1.0, 10.0]
+STATS_BUCKET_LABELS = ["<1ms", "<10ms", "<100ms", "<1s", "<10s", ">=10s"]
+# One (started, command line, command name, status, wall, user, sys) per command.
+command_stats = []
+
+def resource_usage():
+    """Return (user, sys, max RSS in KiB) for this process plus its reaped children, or None."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in KiB on Linux and in bytes on macOS.
+    scale = 1024 if sys.platform == "darwin" else 1
+    return (own.ru_utime + children.ru_utime, own.ru_stime + children.ru_stime,
+            max(own.ru_maxrss, children.ru_maxrss) // scale)
+
+def timed(function, *args):
+    """Call function(*args); return (its result, wall seconds, user seconds, sys seconds, max RSS KiB)."""
+    before = resource_usage()
+    started = time.perf_counter()
+    try:
+        result = function(*args)
+    finally:
+        wall = time.perf_counter() - started
+        after = resource_usage()
+    if before is None:
+        return result, wall, 0.0, 0.0, 0
+    return result, wall, after[0] - before[0], after[1] - before[1], after[2]
+
+def record_command(command, status, wall, user, system):
+    name = command.split(None, 1)[0] if command.strip() else ""
+    command_stats.append((time.time() - wall, command, name, status, wall, user, system))
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+def _format_seconds(seconds):
+    return f"{seconds * 1000:.1f}ms" if seconds < 1 else f"{seconds:.2f}s"
+
+def print_command_stats():
+    """Print count, latency percentiles and a latency histogram per command name."""
+    by_name = collections.defaultdict(list)
+    for _, _, name, _, wall, _, _ in command_stats:
+        by_name[name].append(wall)
+    print(f"{Fore.YELLOW}{'command':<14}{'count':>7}{'total':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}  "
+          f"histogram ({' '.join(STATS_BUCKET_LABELS)}){Style.RESET_ALL}")
+    for name, walls in sorted(by_name.items(), key=lambda item: -sum(item[1])):
+        walls.sort()
+        counts = [0] * (len(STATS_BUCKETS) + 1)
+        for wall in walls:
+            counts[bisect.bisect_right(STATS_BUCKETS, wall)] += 1
+        print(f"{Fore.CYAN}{name:<14}{Style.RESET_ALL}{len(walls):>7}{_format_seconds(sum(walls)):>10}"
+              f"{_format_seconds(_percentile(walls, 0.5)):>10}{_format_seconds(_percentile(walls, 0.9)):>10}"
+              f"{_format_seconds(_percentile(walls, 0.99)):>10}{_format_seconds(walls[-1]):>10}  "
+              f"{' '.join(str(count) for count in counts)}")
+
+def command_stats_records():
+    """Return the recorded commands as dicts."""
+    return [{"started": started, "command": command, "name": name, "status": status,
+             "wall": round(wall, 6), "user": round(user, 6), "sys": round(system, 6)}
+            for started, command, name, status, wall, user, system in command_stats]
+
+def export_command_stats(out):
+    """Write the recorded commands to out as JSON Lines."""
+    for record in command_stats_records():
+        out.write(json.dumps(record) + "\n")
+
+# Builtin registry: command name -> handler(args), where args is argv[1:].
+# Handlers may return an exit status; None counts as success.
+BUILTINS = {}
+last_status = 0
+_interactive = True
+
+def register_builtin(name, handler):
+    """Register (or replace) the handler for a builtin command name."""
+    BUILTINS[name] = handler
+    return handler
+
+def builtin(*names):
+    """Decorator registering a function as the handler for one or more builtin names."""
+    def register(handler):
+        for name in names:
+            register_builtin(name, handler)
+        return handler
+    return register
+
+@builtin("exit", "quit")
+def exit_command(args):
+    """Handle `exit [N]`: leave the shell with status N (default: the last command's)."""
+    if args and not args[0].lstrip("-").isdigit():
+        print(f"{Fore.RED}exit: {args[0]}: numeric argument required{Style.RESET_ALL}")
+        raise SystemExit(2)
+    if _interactive:
+        print(f"{Fore.YELLOW}Exiting shell...{Style.RESET_ALL}")
+    raise SystemExit(int(args[0]) & 0xFF if args else last_status)
+
+@builtin("echo")
+def echo_command(args):
+    echo(args)
+
+@builtin("clear", "cls")
+def clear_command(args):
+    clear_screen()
+
+@builtin("cd")
+def cd_command(args):
+    if not args:
+        print(f"{Fore.RED}cd: missing argument{Style.RESET_ALL}")
+        return 1
+    path = args[0]
+    try:
+        if path == "..":
+            os.chdir(os.path.dirname(os.getcwd()))
+        else:
+            os.chdir(path)
+    except FileNotFoundError:
+        print(f"{Fore.RED}cd: no such file or directory: {path}{Style.RESET_ALL}")
+        return 1
+    except Exception as e:
+        print(f"{Fore.RED}Error changing directory: {e}{Style.RESET_ALL}")
+        return 1
+
+_LS_FLAGS = {
+    "a": ("show_all", True),
+    "l": ("long_format", True),
+    "S": ("sort_by", "size"),
+    "t": ("sort_by", "time"),
+    "R": ("recursive", True),
+}
+
+def _parse_ls_args(args):
+    """Split ls arguments into (paths, options for list_files)."""
+    options = {}
+    paths = []
+    for arg in args:
+        if arg.startswith("-") and len(arg) > 1:
+            for flag in arg[1:]:
+                if flag not in _LS_FLAGS:
+                    raise ValueError(f"invalid option -- '{flag}'")
+                key, value = _LS_FLAGS[flag]
+                options[key] = value
+        else:
+            paths.append(arg)
+    return paths or ["."], options
+
+@builtin("ls")
+def ls_command(args):
+    """Handle `ls [-alStR] [path...]`."""
+    try:
+        paths, options = _parse_ls_args(args)
+    except ValueError as e:
+        print(f"{Fore.RED}ls: {e}{Style.RESET_ALL}")
+        return 1
+    status = 0
+    for i, path in enumerate(paths):
+        if len(paths) > 1:
+            if i:
+                print()
+            print(f"{Fore.YELLOW}{path}:{Style.RESET_ALL}")
+        status = list_files(path, **options) or status
+    return status
+
+@builtin("pwd")
+def pwd_command(args):
+    print(os.getcwd())
+
+@builtin("mkdir")
+def mkdir_command(args):
+    if not args:
+        print(f"{Fore.RED}mkdir: missing directory name{Style.RESET_ALL}")
+        return 1
+    status = 0
+    for dir_name in args:
+        try:
+            os.mkdir(dir_name)
+            print(f"{Fore.GREEN}Directory '{dir_name}' created.{Style.RESET_ALL}")
+        except FileExistsError:
+            print(f"{Fore.RED}mkdir: cannot create directory '{dir_name}': File exists{Style.RESET_ALL}")
+            status = 1
+        except Exception as e:
+            print(f"{Fore.RED}Error creating directory: {e}{Style.RESET_ALL}")
+            status = 1
+    return status
+
+@builtin("rmdir")
+def rmdir_command(args):
+    if not args:
+        print(f"{Fore.RED}rmdir: missing directory name{Style.RESET_ALL}")
+        return 1
+    status = 0
+    for dir_name in args:
+        try:
+            os.rmdir(dir_name)
+            print(f"{Fore.GREEN}Directory '{dir_name}' removed.{Style.RESET_ALL}")
+        except OSError as e:
+            print(f"{Fore.RED}rmdir: failed to remove '{dir_name}': {e}{Style.RESET_ALL}")
+            status = 1
+    return status
+
+def _parse_find_args(args):
+    """Split find arguments into (name, path, options for iter_find)."""
+    positional = []
+    options = {"exclude": []}
+    args = iter(args)
+    for arg in args:
+        if arg == "-noindex":
+            options["use_index"] = False
+        elif arg in ("-maxdepth", "-exclude", "-type"):
+            value = next(args, None)
+            if value is None:
+                raise ValueError(f"missing argument to '{arg}'")
+            if arg == "-maxdepth":
+                if not value.isdigit():
+                    raise ValueError(f"invalid depth '{value}'")
+                options["max_depth"] = int(value)
+            elif arg == "-exclude":
+                options["exclude"].append(value)
+            elif value in ("f", "d", "l"):
+                options["file_type"] = value
+            else:
+                raise ValueError(f"unknown type '{value}' (use f, d or l)")
+        else:
+            positional.append(arg)
+    if not positional:
+        raise ValueError("missing search term")
+    if len(positional) > 2:
+        raise ValueError(f"unexpected argument '{positional[2]}'")
+    return positional[0], positional[1] if len(positional) > 1 else ".", options
+
+@builtin("find")
+def find_command(args):
+    """Handle `find <name> [path] [-maxdepth N] [-exclude GLOB]... [-type f|d|l] [-noindex]`.
+
+    Matches are printed as they are found, from the filename index when one
+    covers path and from the parallel walker otherwise.
+    """
+    try:
+        name, path, options = _parse_find_args(args)
+    except ValueError as e:
+        print(f"{Fore.RED}find: {e}{Style.RESET_ALL}")
+        return 1
+    found = 0
+    try:
+        for result in iter_find(name, path, **options):
+            if not found:
+                print(f"{Fore.YELLOW}Found the following matches:{Style.RESET_ALL}")
+            found += 1
+            print(f"{Fore.BLUE}{result}{Style.RESET_ALL}")
+    except Exception as e:
+        print(f"{Fore.RED}Error during find operation: {e}{Style.RESET_ALL}")
+        return 1
+    if not found:
+        print(f"{Fore.RED}No matches found for '{name}'{Style.RESET_ALL}")
+        return 1
+
+def _grep_needs_system(args):
+    """True when args use an option the builtin grep does not implement."""
+    args = iter(args)
+    for arg in args:
+        if arg == "-exclude":
+            next(args, None)
+        elif not arg.startswith("-") or arg == "-":
+            return False
+        elif set(arg[1:]) - set(GREP_FLAGS):
+            return True
+    return False
+
+def _parse_grep_args(args):
+    """Split grep arguments into (compiled bytes regex, paths, options)."""
+    flags = set()
+    exclude = list(GREP_EXCLUDE)
+    positional = []
+    args = iter(args)
+    for arg in args:
+        if arg == "-exclude":
+            value = next(args, None)
+            if value is None:
+                raise ValueError(f"missing argument to '{arg}'")
+            exclude.append(value)
+        elif arg.startswith("-") and len(arg) > 1 and not positional:
+            for flag in arg[1:]:
+                if flag not in GREP_FLAGS:
+                    raise ValueError(f"invalid option -- '{flag}'")
+                flags.add(flag)
+        else:
+            positional.append(arg)
+    if not positional:
+        raise ValueError("missing search pattern")
+    pattern = os.fsencode(positional[0])
+    if "F" in flags:
+        pattern = re.escape(pattern)
+    if "w" in flags:
+        pattern = rb"\b(?:" + pattern + rb")\b"
+    try:
+        regex = re.compile(pattern, re.MULTILINE | (re.IGNORECASE if "i" in flags else 0))
+    except re.error as e:
+        raise ValueError(f"invalid pattern: {e}")
+    paths = positional[1:]
+    # As in grep, file names are shown when more than one file can match:
+    # several paths or a directory. -H and -h force them on or off.
+    with_filename = len(paths) != 1 or os.path.isdir(paths[0])
+    if "H" in flags or "h" in flags:
+        with_filename = "H" in flags
+    return regex, paths, {"exclude": exclude, "files_only": "l" in flags,
+                          "line_numbers": "n" in flags, "with_filename": with_filename}
+
+def _grep_stream(regex, fd, line_numbers=False):
+    """Print the lines read from fd that match regex; return the number printed."""
+    found = 0
+    with open(os.dup(fd), "rb") as stream:
+        for number, line in enumerate(stream, 1):
+            if regex.search(line):
+                found += 1
+                prefix = f"{Fore.GREEN}{number}{Style.RESET_ALL}:" if line_numbers else ""
+                sys.stdout.write(prefix + line.rstrip(b"\r\n").decode(errors="replace") + "\n")
+    return found
+
+@builtin("grep")
+def grep_command(args):
+    """Handle `grep [-iFwlnrRhH] [-exclude GLOB]... <pattern> [path...]`.
+
+    Directories are searched recursively (-r and -R are accepted but
+    implied) and matches print while the search runs, prefixed with the path
+    when several files are searched and with the line number under -n.
+    Without a path, lines from a pipe on stdin are searched, or the current
+    directory when stdin is a terminal. The status is 0 when something
+    matched, 1 when nothing did and 2 on errors, as in grep. Other options
+    run the system grep instead.
+    """
+    if _grep_needs_system(args) and which("grep"):
+        sys.stdout.flush()
+        return execute_command(["grep", *args])
+    try:
+        regex, paths, options = _parse_grep_args(args)
+    except ValueError as e:
+        print(f"{Fore.RED}grep: {e}{Style.RESET_ALL}")
+        return 2
+    if not paths and not os.isatty(0):
+        return 0 if _grep_stream(regex, 0, options["line_numbers"]) else 1
+    errors = []
+    found = 0
+    for path, matches in iter_grep(regex, paths or ["."], options["exclude"], errors=errors):
+        found += 1
+        if options["files_only"]:
+            sys.stdout.write(f"{Fore.MAGENTA}{path}{Style.RESET_ALL}\n")
+            continue
+        prefix = f"{Fore.MAGENTA}{path}{Style.RESET_ALL}:" if options["with_filename"] else ""
+        if options["line_numbers"]:
+            sys.stdout.write("".join(f"{prefix}{Fore.GREEN}{line}{Style.RESET_ALL}:{text.decode(errors='replace')}\n"
+                                     for line, text in matches))
+        else:
+            sys.stdout.write("".join(f"{prefix}{text.decode(errors='replace')}\n" for _, text in matches))
+    sys.stdout.flush()
+    for path, error in errors[:FILE_ERRORS_SHOWN]:
+        print(f"{Fore.RED}grep: {path}: {error.strerror or error}{Style.RESET_ALL}")
+    if errors:
+        return 2
+    return 0 if found else 1
+
+@builtin("index")
+def index_command(args):
+    """Handle `index build [path]`, `index status` and `index drop [path]`."""
+    action = args[0] if args else "status"
+    path = args[1] if len(args) > 1 else "."
+    try:
+        if action == "build":
+            started = time.time()
+            index = build_index(path)
+            entries = sum(len(entries) for _, entries in index["dirs"].values())
+            print(f"{Fore.GREEN}Indexed {entries} entries in {len(index['dirs'])} directories "
+                  f"under {index['root']} ({time.time() - started:.2f}s){Style.RESET_ALL}")
+        elif action == "drop":
+            if drop_index(path):
+                print(f"{Fore.GREEN}Index for {os.path.abspath(path)} dropped.{Style.RESET_ALL}")
+            else:
+                print(f"{Fore.RED}index: no index for {os.path.abspath(path)}{Style.RESET_ALL}")
+                return 1
+        elif action == "status":
+            headers = list_indexes()
+            if not headers:
+                print(f"{Fore.YELLOW}No indexes. Create one with 'index build [path]'.{Style.RESET_ALL}")
+            for header in headers:
+                age = time.time() - header["refreshed"]
+                print(f"{Fore.CYAN}{header['root']}{Style.RESET_ALL}: {header['entries']} entries, "
+                      f"{header['dirs']} directories, {header['size'] / 1024:.0f} KiB, refreshed {age:.0f}s ago")
+        else:
+            print(f"{Fore.RED}index: unknown action '{action}' (use build, status or drop){Style.RESET_ALL}")
+            return 1
+    except OSError as e:
+        print(f"{Fore.RED}index: {e}{Style.RESET_ALL}")
+        return 1
+
+@builtin("hash")
+def hash_command(args):
+    """Handle `hash` (list), `hash -r` (reset), `hash -d name` (forget) and `hash name...` (look up)."""
+    if not args:
+        if not _command_hash:
+            print(f"{Fore.YELLOW}hash: hash table empty{Style.RESET_ALL}")
+        else:
+            print(f"{Fore.YELLOW}hits\tcommand{Style.RESET_ALL}")
+            for name, (path, hits) in sorted(_command_hash.items()):
+                print(f"{hits:4}\t{Fore.CYAN}{path}{Style.RESET_ALL}")
+        return
+    if args[0] == "-r":
+        forget_command()
+        return
+    if args[0] == "-d":
+        for name in args[1:]:
+            forget_command(name)
+        return
+    status = 0
+    for name in args:
+        if which(name) is None:
+            print(f"{Fore.RED}hash: {name}: not found{Style.RESET_ALL}")
+            status = 1
+        elif name in _command_hash:
+            # Only the lookup above was counted; it is not a use of the command.
+            _command_hash[name][1] -= 1
+    return status
+
+@builtin("download")
+def download_command(args):
+    """Handle `download [-j N] [--sha256 HEX | --checksum ALGO:HEX] <url> [file]`."""
+    options = {}
+    positional = []
+    args = iter(args)
+    for arg in args:
+        if arg in ("-j", "--sha256", "--checksum"):
+            value = next(args, None)
+            if value is None:
+                print(f"{Fore.RED}download: missing argument to '{arg}'{Style.RESET_ALL}")
+                return 1
+            if arg == "-j":
+                if not value.isdigit() or int(value) < 1:
+                    print(f"{Fore.RED}download: invalid segment count '{value}'{Style.RESET_ALL}")
+                    return 1
+                options["segments"] = int(value)
+            else:
+                options["checksum"] = value if arg == "--checksum" else f"sha256:{value}"
+        else:
+            positional.append(arg)
+    if not positional:
+        print(f"{Fore.RED}download: missing URL{Style.RESET_ALL}")
+        return 1
+    url = positional[0]
+    filename = positional[1] if len(positional) > 1 else \
+        os.path.basename(url.split("?", 1)[0].rstrip("/")) or "download"
+    try:
+        download_file(url, filename, **options)
+        print(f"{Fore.GREEN}Saved {filename}.{Style.RESET_ALL}")
+    except Exception as e:
+        print(f"{Fore.RED}download: {e}{Style.RESET_ALL}")
+        return 1
+
+@builtin("help")
+def help_command(args):
+    print_help()
+
+@builtin("sysinfo")
+def sysinfo_command(args):
+    system_info()
+
+@builtin("timestamp")
+def timestamp_command(args):
+    print(datetime.now().isoformat())
+
+@builtin("history")
+def history_command(args):
+    """Handle `history [N]` (last N entries) and `history search <term>`."""
+    if args and args[0] == "search":
+        if len(args) < 2:
+            print(f"{Fore.RED}Usage: history search <term>{Style.RESET_ALL}")
+            return 1
+        found = False
+        for number, cmd in search_history(" ".join(args[1:])):
+            print(f"{number}: {cmd}")
+            found = True
+        return 0 if found else 1
+    start = 0
+    if args:
+        if not args[0].isdigit():
+            print(f"{Fore.RED}Usage: history [N] | history search <term>{Style.RESET_ALL}")
+            return 1
+        start = max(len(history) - int(args[0]), 0)
+    for i in range(start, len(history)):
+        print(f"{i + 1}: {history[i]}")
+
+@builtin("install")
+def install_command(args):
+    """Handle `install [--refresh] <pkg>...`: one transaction for all packages."""
+    force_refresh = "--refresh" in args
+    packages = [arg for arg in args if arg != "--refresh"]
+    if not packages:
+        print(f"{Fore.RED}install: missing package name{Style.RESET_ALL}")
+        return 1
+    try:
+        return install_packages(packages, force_refresh)
+    except Exception as e:
+        print(f"{Fore.RED}Error during installation: {e}{Style.RESET_ALL}")
+        return 1
+
+@builtin("sudo")
+def sudo_command(args):
+    return execute_command(args, use_sudo=True)
+
+@builtin("cat")
+def cat_command(args):
+    """Handle `cat [-n] [file...]`; with no file (or `-`), copy stdin so cat works in a pipe."""
+    numberer = None
+    if args and args[0] == "-n":
+        numberer = LineNumberer()
+        args = args[1:]
+    if not args and os.isatty(0):
+        print(f"{Fore.RED}cat: missing file name{Style.RESET_ALL}")
+        return 1
+    status = 0
+    for file_name in args or ["-"]:
+        if file_name == "-":
+            cat_fd(0, numberer)
+        else:
+            status = cat_file(file_name, numberer) or status
+    return status
+
+@builtin("touch")
+def touch_command(args):
+    if not args:
+        print(f"{Fore.RED}touch: missing file name{Style.RESET_ALL}")
+        return 1
+    status = 0
+    for file_name in args:
+        status = touch_file(file_name) or status
+    return status
+
+@builtin("rm")
+def rm_command(args):
+    recursive = force = False
+    paths = []
+    for i, arg in enumerate(args):
+        if arg == "--":
+            paths.extend(args[i + 1:])
+            break
+        if arg.startswith("-") and len(arg) > 1 and not paths:
+            unknown = set(arg[1:]) - set("rRf")
+            if unknown:
+                print(f"{Fore.RED}rm: invalid option -- '{min(unknown)}'{Style.RESET_ALL}")
+                return 1
+            recursive = recursive or "r" in arg or "R" in arg
+            force = force or "f" in arg
+        else:
+            paths.append(arg)
+    if not paths:
+        if force:
+            return 0
+        print(f"{Fore.RED}rm: missing file name{Style.RESET_ALL}")
+        return 1
+    refused = [path for path in paths
+               if os.path.basename(path.rstrip("/")) in (".", "..") or os.path.realpath(path) == os.path.realpath("/")]
+    for path in refused:
+        print(f"{Fore.RED}rm: refusing to remove '{path}'{Style.RESET_ALL}")
+    files, directories, errors = remove_paths([path for path in paths if path not in refused], recursive, force)
+    for path, error in errors[:FILE_ERRORS_SHOWN]:
+        print(f"{Fore.RED}rm: cannot remove '{path}': {error.strerror or error}{Style.RESET_ALL}")
+    if len(errors) > FILE_ERRORS_SHOWN:
+        print(f"{Fore.RED}rm: ... and {len(errors) - FILE_ERRORS_SHOWN} more errors{Style.RESET_ALL}")
+    removed = [_plural(files, "file")] if files else []
+    if directories:
+        removed.append(_plural(directories, "directory", "directories"))
+    if removed:
+        print(f"{Fore.GREEN}Removed {' and '.join(removed)}.{Style.RESET_ALL}")
+    return 1 if errors or refused else 0
+
+def _parse_copy_args(args, letters):
+    """Split cp/mv arguments into (flags given, [(source, destination), ...])."""
+    flags = set()
+    paths = []
+    for i, arg in enumerate(args):
+        if arg == "--":
+            paths.extend(args[i + 1:])
+            break
+        if arg == "--progress":
+            flags.add("progress")
+        elif arg.startswith("-") and len(arg) > 1:
+            for flag in arg[1:]:
+                if flag not in letters:
+                    raise ValueError(f"invalid option -- '{flag}'")
+                flags.add(flag)
+        else:
+            paths.append(arg)
+    if len(paths) < 2:
+        raise ValueError(f"missing destination file operand after '{paths[0]}'" if paths else "missing file operand")
+    *sources, destination = paths
+    if os.path.isdir(destination):
+        return flags, [(src, os.path.join(destination, os.path.basename(src.rstrip("/")) or src)) for src in sources]
+    if len(sources) > 1:
+        raise ValueError(f"target '{destination}' is not a directory")
+    return flags, [(sources[0], destination)]
+
+def _report_transfer(name, verb, files, size, errors, started):
+    """Print a cp/mv run's errors and, when started is set, its summary line; return the status."""
+    if started is not None and sys.stderr.isatty():
+        print("\r\x1b[K", end="", file=sys.stderr, flush=True)
+    for path, error in errors[:FILE_ERRORS_SHOWN]:
+        print(f"{Fore.RED}{name}: cannot {verb} '{path}': {error.strerror or error}{Style.RESET_ALL}")
+    if len(errors) > FILE_ERRORS_SHOWN:
+        print(f"{Fore.RED}{name}: ... and {len(errors) - FILE_ERRORS_SHOWN} more errors{Style.RESET_ALL}")
+    if started is not None:
+        elapsed = time.monotonic() - started
+        rate = _format_bytes(size / elapsed) if elapsed else "-"
+        print(f"{Fore.GREEN}Copied {_plural(files, 'file')} ({_format_bytes(size)}) in "
+              f"{_format_seconds(elapsed)}, {rate}/s.{Style.RESET_ALL}")
+    return 1 if errors else 0
+
+@builtin("cp")
+def cp_command(args):
+    try:
+        flags, pairs = _parse_copy_args(args, "rR")
+    except ValueError as e:
+        print(f"{Fore.RED}cp: {e}{Style.RESET_ALL}")
+        return 1
+    progress = _copy_progress() if "progress" in flags else None
+    started = time.monotonic() if progress else None
+    files, size, errors = copy_paths(pairs, recursive="r" in flags or "R" in flags, progress=progress)
+    return _report_transfer("cp", "copy", files, size, errors, started)
+
+@builtin("mv")
+def mv_command(args):
+    try:
+        flags, pairs = _parse_copy_args(args, "")
+    except ValueError as e:
+        print(f"{Fore.RED}mv: {e}{Style.RESET_ALL}")
+        return 1
+    progress = _copy_progress() if "progress" in flags else None
+    started = time.monotonic() if progress else None
+    renamed, files, size, errors = move_paths(pairs, progress=progress)
+    if started is not None and renamed:
+        print(f"{Fore.GREEN}Renamed {_plural(renamed, 'path')}.{Style.RESET_ALL}")
+    return _report_transfer("mv", "move", files, size, errors, started if files else None)
+
+@builtin("vim")
+def vim_command(args):
+    if not args:
+        print(f"{Fore.RED}vim: missing file name{Style.RESET_ALL}")
+        return 1
+    return edit_file(*args)
+
+@builtin("testo")
+def testo_command(args):
+    testo()
+
+@builtin("devtool")
+def devtool_command(args):
+    if not args:
+        print(f"{Fore.RED}devtool: missing tool name{Style.RESET_ALL}")
+        print(f"{Fore.YELLOW}Available tools: {', '.join(DEVELOPMENT_TOOLS)}{Style.RESET_ALL}")
+        return 1
+    return install_development_tools(args)
+
+@builtin("parallel")
+def parallel_command(args):
+    """Handle `parallel [-j N] [-k] [--halt-on-error] <command> [args...] [::: value...]`.
+
+    Without `:::` the values are read from stdin, one per line, so
+    `ls | parallel gzip` works.
+    """
+    jobs = PARALLEL_JOBS
+    options = {}
+    args = list(args)
+    while args and args[0].startswith("-"):
+        arg = args.pop(0)
+        if arg == "-j" and args and args[0].isdigit() and int(args[0]) > 0:
+            jobs = int(args.pop(0))
+        elif arg.startswith("-j") and arg[2:].isdigit() and int(arg[2:]) > 0:
+            jobs = int(arg[2:])
+        elif arg in ("-k", "--keep-order"):
+            options["keep_order"] = True
+        elif arg == "--halt-on-error":
+            options["halt_on_error"] = True
+        else:
+            print(f"{Fore.RED}parallel: invalid option '{arg}'{Style.RESET_ALL}")
+            return 1
+    split = args.index(":::") if ":::" in args else len(args)
+    template = args[:split]
+    if not template:
+        print(f"{Fore.RED}Usage: parallel [-j N] [-k] [--halt-on-error] <command> [args...] ::: value...{Style.RESET_ALL}")
+        return 1
+    if split < len(args):
+        values = args[split + 1:]
+    elif os.isatty(0):
+        print(f"{Fore.RED}parallel: no values; give them after ::: or pipe them in{Style.RESET_ALL}")
+        return 1
+    else:
+        values = [line for line in b"".join(iter(lambda: os.read(0, 65536), b"")).decode().splitlines() if line]
+    # Like GNU parallel: the exit status is the number of failed jobs, capped at 101.
+    return min(run_parallel(template, values, jobs, **options), 101)
+
+@builtin("jobs")
+def jobs_command(args):
+    """Handle `jobs`: list background and stopped jobs."""
+    for job_id, job in sorted(jobs.items()):
+        if job.state == "Running":
+            job.update()
+        marker = "+" if job_id == max(jobs) else " "
+        color = Fore.GREEN if job.state == "Running" else Fore.YELLOW
+        print(f"[{job_id}]{marker}  {color}{job.state:<22}{Style.RESET_ALL}  {job.command}")
+    for job_id in [job_id for job_id, job in jobs.items() if job.state == "Done"]:
+        del jobs[job_id]
+
+@builtin("fg")
+def fg_command(args):
+    """Handle `fg [%n]`: resume a job in the foreground and wait for it."""
+    try:
+        job = _find_job(args[0] if args else None)
+    except ValueError as e:
+        print(f"{Fore.RED}fg: {e}{Style.RESET_ALL}")
+        return 1
+    print(job.command)
+    if job.pgid:
+        _give_terminal_to(job.pgid)
+    _continue_job(job)
+    return wait_for_job(job)
+
+@builtin("bg")
+def bg_command(args):
+    """Handle `bg [%n]`: resume a stopped job in the background."""
+    try:
+        job = _find_job(args[0] if args else None)
+    except ValueError as e:
+        print(f"{Fore.RED}bg: {e}{Style.RESET_ALL}")
+        return 1
+    _continue_job(job)
+    print(f"[{job.id}]+ {job.command} &")
+
+@builtin("wait")
+def wait_command(args):
+    """Handle `wait [%n...]`: wait for the given (default: all) background jobs."""
+    try:
+        waiting = [_find_job(spec) for spec in args] if args else list(jobs.values())
+    except ValueError as e:
+        print(f"{Fore.RED}wait: {e}{Style.RESET_ALL}")
+        return 127
+    status = 0
+    try:
+        for job in waiting:
+            while job.state == "Running":
+                job.update(block=True)
+            status = job.status() if job.state == "Done" else 128 + signal.SIGTSTP
+    except KeyboardInterrupt:
+        print()
+        return 130
+    return status
+
+@builtin("kill")
+def kill_command(args):
+    """Handle `kill [-SIGNAL] %n|pid...`."""
+    signum = signal.SIGTERM
+    if args and args[0].startswith("-") and len(args[0]) > 1:
+        name = args.pop(0)[1:].upper()
+        try:
+            signum = int(name) if name.isdigit() else signal.Signals(name if name.startswith("SIG") else "SIG" + name)
+        except (KeyError, ValueError):
+            print(f"{Fore.RED}kill: {name}: invalid signal specification{Style.RESET_ALL}")
+            return 1
+    if not args:
+        print(f"{Fore.RED}Usage: kill [-SIGNAL] %job|pid...{Style.RESET_ALL}")
+        return 1
+    status = 0
+    for target in args:
+        try:
+            if target.startswith("%"):
+                job = _find_job(target)
+                _signal_job(job, signum)
+                if job.state == "Stopped" and signum not in (signal.SIGSTOP, signal.SIGTSTP):
+                    # A stopped job only acts on most signals once continued.
+                    _continue_job(job)
+            else:
+                os.kill(int(target), signum)
+        except (ValueError, OSError) as e:
+            print(f"{Fore.RED}kill: {target}: {e}{Style.RESET_ALL}")
+            status = 1
+    return status
+
+@builtin("time")
+def time_command(args):
+    """Handle `time <command>`: run it and report wall, user and sys time and max RSS."""
+    if not args:
+        print(f"{Fore.RED}Usage: time <command>{Style.RESET_ALL}")
+        return 1
+    status, wall, user, system, maxrss = timed(dispatch, args)
+    sys.stdout.flush()
+    print(f"\nreal\t{wall:.3f}s\nuser\t{user:.3f}s\nsys\t{system:.3f}s\nmaxrss\t{maxrss} KiB",
+          file=sys.stderr)
+    return status
+
+@builtin("stats")
+def stats_command(args):
+    """Handle `stats [on|off|reset|export [file]]`: per-command latency statistics."""
+    global STATS_ENABLED
+    action = args[0] if args else "show"
+    if action in ("on", "off"):
+        STATS_ENABLED = action == "on"
+    elif action == "reset":
+        command_stats.clear()
+    elif action == "export":
+        try:
+            if len(args) > 1:
+                with open(args[1], "a", encoding="utf-8") as out:
+                    export_command_stats(out)
+                print(f"{Fore.GREEN}Exported {len(command_stats)} commands to {args[1]}.{Style.RESET_ALL}")
+            else:
+                export_command_stats(sys.stdout)
+        except OSError as e:
+            print(f"{Fore.RED}stats: {e}{Style.RESET_ALL}")
+            return 1
+    elif action == "show":
+        if not command_stats:
+            state = "on" if STATS_ENABLED else "off; enable it with 'stats on'"
+            print(f"{Fore.YELLOW}No commands recorded (collection is {state}).{Style.RESET_ALL}")
+            return
+        print_command_stats()
+    else:
+        print(f"{Fore.RED}stats: unknown action '{action}' (use on, off, reset or export){Style.RESET_ALL}")
+        return 1
+
+# Structured results
+# A collector is the data side of a builtin: it takes the same arguments but
+# returns (status, data) instead of printing, and raises OSError or
+# ValueError on failure. Shell.run uses them so embedding callers get Python
+# objects without any text formatting.
+COLLECTORS = {}
+
+def collector(*names):
+    """Decorator registering a function as the collector for one or more builtin names."""
+    def decorate(function):
+        for name in names:
+            COLLECTORS[name] = function
+        return function
+    return decorate
+
+def _entry_record(entry, with_stat):
+    """Describe a DirEntry as a dict; size, mode and mtime only when with_stat."""
+    kind = "symlink" if entry.is_symlink() else "dir" if entry.is_dir() else "file"
+    record = {"name": entry.name, "path": entry.path, "type": kind}
+    if with_stat:
+        st = entry.stat(follow_symlinks=False)
+        record.update(size=st.st_size, mode=stat.filemode(st.st_mode), mtime=st.st_mtime)
+    return record
+
+def collect_entries(path=".", show_all=False, long_format=False, sort_by="name", recursive=False):
+    """Return list_files' entries for path as dicts (recursing like `ls -R`)."""
+    try:
+        entries = scan_directory(path, show_all)
+    except NotADirectoryError:
+        st = os.lstat(path)
+        return [{"name": os.path.basename(path), "path": path, "type": "file", "size": st.st_size,
+                 "mode": stat.filemode(st.st_mode), "mtime": st.st_mtime}]
+    _sort_entries(entries, sort_by)
+    records = [_entry_record(entry, long_format) for entry in entries]
+    if recursive:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                records.extend(collect_entries(entry.path, show_all, long_format, sort_by, recursive))
+    return records
+
+@collector("ls")
+def ls_collector(args):
+    paths, options = _parse_ls_args(args)
+    return 0, [record for path in paths for record in collect_entries(path, **options)]
+
+@collector("find")
+def find_collector(args):
+    name, path, options = _parse_find_args(args)
+    matches = list(iter_find(name, path, **options))
+    return (0 if matches else 1), matches
+
+@collector("grep")
+def grep_collector(args):
+    regex, paths, options = _parse_grep_args(args)
+    if options["files_only"]:
+        files = [path for path, _ in iter_grep(regex, paths or ["."], options["exclude"])]
+        return (0 if files else 1), files
+    matches = [{"path": path, "line": line, "text": text.decode(errors="replace")}
+               for path, found in iter_grep(regex, paths or ["."], options["exclude"])
+               for line, text in found]
+    return (0 if matches else 1), matches
+
+@collector("cat")
+def cat_collector(args):
+    numberer = None
+    if args and args[0] == "-n":
+        numberer = LineNumberer()
+        args = args[1:]
+    if not args:
+        raise ValueError("missing file name")
+    chunks = []
+    for file_name in args:
+        with open(file_name, "rb") as f:
+            data = f.read()
+        chunks.append(numberer.number(data) if numberer else data)
+    return 0, b"".join(chunks)
+
+@collector("cd")
+def cd_collector(args):
+    if not args:
+        raise ValueError("missing argument")
+    os.chdir(args[0])
+    return 0, os.getcwd()
+
+@collector("pwd")
+def pwd_collector(args):
+    return 0, os.getcwd()
+
+@collector("echo")
+def echo_collector(args):
+    return 0, " ".join(args)
+
+@collector("sysinfo")
+def sysinfo_collector(args):
+    return 0, system_details()
+
+@collector("timestamp")
+def timestamp_collector(args):
+    return 0, datetime.now().isoformat()
+
+@collector("history")
+def history_collector(args):
+    if args and args[0] == "search":
+        return 0, [{"number": number, "command": cmd} for number, cmd in search_history(" ".join(args[1:]))]
+    return 0, list(history)
+
+@collector("hash")
+def hash_collector(args):
+    return 0, {name: {"path": path, "hits": hits} for name, (path, hits) in _command_hash.items()}
+
+@collector("jobs")
+def jobs_collector(args):
+    for job in jobs.values():
+        if job.state == "Running":
+            job.update()
+    return 0, [{"id": job_id, "state": job.state, "command": job.command, "pgid": job.pgid}
+               for job_id, job in sorted(jobs.items())]
+
+@collector("stats")
+def stats_collector(args):
+    return 0, command_stats_records()
+
+def dispatch(args):
+    """Run one parsed simple command: a registered builtin, else an external program."""
+    handler = BUILTINS.get(args[0])
+    if handler is None:
+        if _job_control and not COLOR_CHILD_OUTPUT:
+            # Run in its own process group so Ctrl-Z can stop it.
+            return run_pipeline([(args, [])], command=shlex.join(args))
+        return execute_command(args)
+    return handler(args[1:]) or 0
+
+# Pipelines and redirection
+class Operator(str):
+    """A `|`, `<`, `>`, `>>`, `>&` or `&` token, optionally prefixed by a file descriptor (`2>`)."""
+
+class Pattern(str):
+    """A word containing unquoted glob (*, ?, [) or brace characters.
+
+    The str value is the word as typed minus its quotes; `raw` is the same
+    word with every quoted character backslash-escaped, for expand_words.
+    """
+
+    def __new__(cls, text, raw):
+        word = super().__new__(cls, text)
+        word.raw = raw
+        return word
+
+_PATTERN_CHARS = "*?[{"
+
+def tokenize(line):
+    """Split a command line into words, Pattern words and Operator tokens.
+
+    Quoting and escaping follow the same POSIX rules as shlex.split; only
+    unquoted |, <, > and & characters are treated as operators, and only
+    unquoted *, ?, [ and { make a word a Pattern.
+    """
+    tokens = []
+    word = []
+    raw = []
+    in_word = False
+    quoted = False
+    pattern = False
+    i, n = 0, len(line)
+
+    def end_word():
+        nonlocal word, raw, in_word, quoted, pattern
+        if in_word:
+            text = "".join(word)
+            tokens.append(Pattern(text, "".join(raw)) if pattern else text)
+        word, raw, in_word, quoted, pattern = [], [], False, False, False
+
+    def add_quoted(text):
+        word.append(text)
+        raw.extend("\\" + c for c in text)
+
+    while i < n:
+        c = line[i]
+        if c.isspace():
+            end_word()
+            i += 1
+        elif c == "\\":
+            if i + 1 >= n:
+                raise ValueError("No escaped character")
+            add_quoted(line[i + 1])
+            in_word = quoted = True
+            i += 2
+        elif c == "'":
+            end = line.find("'", i + 1)
+            if end < 0:
+                raise ValueError("No closing quotation")
+            add_quoted(line[i + 1:end])
+            in_word = quoted = True
+            i = end + 1
+        elif c == '"':
+            i += 1
+            while True:
+                if i >= n:
+                    raise ValueError("No closing quotation")
+                c = line[i]
+                if c == '"':
+                    break
+                if c == "\\" and i + 1 < n and line[i + 1] in '\\"$`\n':
+                    i += 1
+                    c = line[i]
+                add_quoted(c)
+                i += 1
+            in_word = quoted = True
+            i += 1
+        elif c in "|<>":
+            prefix = ""
+            if in_word and not quoted and c != "|" and "".join(word).isdigit():
+                prefix = "".join(word)
+                word, raw, in_word = [], [], False
+            end_word()
+            if line.startswith(">>", i) or line.startswith(">&", i):
+                op = line[i:i + 2]
+            else:
+                op = c
+            tokens.append(Operator(prefix + op))
+            i += len(op)
+        elif c == "&":
+            end_word()
+            tokens.append(Operator(c))
+            i += 1
+        else:
+            word.append(c)
+            raw.append(c)
+            pattern = pattern or c in _PATTERN_CHARS
+            in_word = True
+            i += 1
+    end_word()
+    return tokens
+
+def split_background(tokens):
+    """Strip a trailing `&`; return (tokens, run_in_background)."""
+    background = bool(tokens) and tokens[-1] == "&" and isinstance(tokens[-1], Operator)
+    if background:
+        tokens = tokens[:-1]
+    if any(token == "&" and isinstance(token, Operator) for token in tokens):
+        raise ValueError("syntax error near unexpected token '&'")
+    if background and not tokens:
+        raise ValueError("syntax error near unexpected token '&'")
+    return tokens, background
+
+def parse_pipeline(tokens):
+    """Group tokens into a list of (argv, redirections) stages.
+
+    Each redirection is (fd, op, target) where op is "<", ">", ">>" or "dup"
+    (for N>&M, with target the fd number to duplicate).
+    """
+    stages = []
+    argv, redirects = [], []
+    tokens = iter(tokens)
+    for token in tokens:
+        if not isinstance(token, Operator):
+            argv.append(token)
+            continue
+        if token == "|":
+            if not argv:
+                raise ValueError("syntax error near unexpected token '|'")
+            stages.append((argv, redirects))
+            argv, redirects = [], []
+            continue
+        target = next(tokens, None)
+        if target is None or isinstance(target, Operator):
+            raise ValueError(f"syntax error near unexpected token '{target or 'newline'}'")
+        op = token.lstrip("0123456789")
+        fd = int(token[:len(token) - len(op)] or (0 if op == "<" else 1))
+        if fd > 2:
+            raise ValueError(f"unsupported file descriptor: {fd}")
+        if op == ">&":
+            if target not in ("0", "1", "2"):
+                raise ValueError(f"bad file descriptor: {target}")
+            redirects.append((fd, "dup", int(target)))
+        else:
+            redirects.append((fd, op, target))
+    if not argv:
+        if stages or redirects:
+            raise ValueError("syntax error: missing command")
+        return stages
+    stages.append((argv, redirects))
+    return stages
+
+# Glob and brace expansion
+# expand_words runs once per command line. Directory listings come from
+# the listing cache (the same mtime-checked cache Tab completion uses) and are
+# also memoized for the line, so patterns such as `src/*.py src/*.txt` or a
+# `**` walk read each directory at most once, and an unchanged directory is
+# not rescanned on the next line either.
+_ESCAPED = re.compile(r"\\(.)", re.S)
+_BRACE_RANGE = re.compile(r"^(-?\d+|[A-Za-z])\.\.(-?\d+|[A-Za-z])(?:\.\.(-?\d+))?$")
+
+def _unescape(raw):
+    return _ESCAPED.sub(r"\1", raw)
+
+def _split_top_level(body):
+    """Split a brace body on unescaped commas outside nested braces, or return None."""
+    parts, depth, start, i = [], 0, 0, 0
+    while i < len(body):
+        c = body[i]
+        if c == "\\":
+            i += 1
+        elif c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+        elif c == "," and depth == 0:
+            parts.append(body[start:i])
+            start = i + 1
+        i += 1
+    if not parts:
+        return None
+    return parts + [body[start:]]
+
+def _brace_range(body):
+    """Expand a {1..5}, {01..10..2} or {a..e} body, or return None."""
+    match = _BRACE_RANGE.match(body)
+    if not match:
+        return None
+    first, last, step = match.groups()
+    step = abs(int(step)) if step and int(step) else 1
+    if first.lstrip("-").isdigit() and last.lstrip("-").isdigit():
+        start, end = int(first), int(last)
+        width = max(len(first), len(last)) if first.lstrip("-").startswith("0") or \
+            last.lstrip("-").startswith("0") else 0
+        values = range(start, end + 1, step) if start <= end else range(start, end - 1, -step)
+        return [str(value).zfill(width) for value in values]
+    if len(first) == 1 and len(last) == 1 and not first.isdigit() and not last.isdigit():
+        start, end = ord(first), ord(last)
+        values = range(start, end + 1, step) if start <= end else range(start, end - 1, -step)
+        return [chr(value) for value in values]
+    return None
+
+def expand_braces(raw):
+    """Expand the first valid {a,b} or {x..y} group in raw, recursively; escapes are kept."""
+    i = 0
+    while i < len(raw):
+        if raw[i] == "\\":
+            i += 2
+            continue
+        if raw[i] == "{":
+            depth, j = 0, i
+            while j < len(raw):
+                if raw[j] == "\\":
+                    j += 1
+                elif raw[j] == "{":
+                    depth += 1
+                elif raw[j] == "}":
+                    depth -= 1
+                    if depth == 0:
+                        break
+                j += 1
+            if j < len(raw):
+                body = raw[i + 1:j]
+                alternatives = _split_top_level(body)
+                if alternatives is None:
+                    alternatives = _brace_range(body)
+                if alternatives is not None:
+                    prefix, suffix = raw[:i], raw[j + 1:]
+                    return [word for alternative in alternatives
+                            for word in expand_braces(prefix + alternative + suffix)]
+        i += 1
+    return [raw]
+
+def _has_magic(raw):
+    i = 0
+    while i < len(raw):
+        if raw[i] == "\\":
+            i += 2
+            continue
+        if raw[i] in "*?[":
+            return True
+        i += 1
+    return False
+
+# POSIX character classes inside bracket expressions, as regex class bodies.
+_CHAR_CLASSES = {
+    "alpha": "a-zA-Z", "digit": "0-9", "alnum": "a-zA-Z0-9", "upper": "A-Z", "lower": "a-z",
+    "xdigit": "0-9A-Fa-f", "space": r" \t\n\r\f\v", "blank": r" \t", "cntrl": r"\x00-\x1f\x7f",
+    "print": r"\x20-\x7e", "graph": r"\x21-\x7e",
+    "punct": "".join(re.escape(c) for c in "!\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~"),
+}
+
+def _bracket_regex(raw, start):
+    """Translate the bracket expression opening at raw[start]; return (regex, index of its ]) or None.
+
+    None means the bracket is not a valid expression (unclosed, or a range
+    such as z-a), and the caller matches the [ literally, as sh does.
+    """
+    i = start + 1
+    negate = raw[i:i + 1] in ("!", "^")
+    if negate:
+        i += 1
+    parts = []
+    first = i
+    while i < len(raw):
+        c = raw[i]
+        if c == "]" and i > first:
+            break
+        if c == "[" and raw[i + 1:i + 2] == ":":
+            end = raw.find(":]", i + 2)
+            if end >= 0 and raw[i + 2:end] in _CHAR_CLASSES:
+                parts.append(_CHAR_CLASSES[raw[i + 2:end]])
+                i = end + 2
+                continue
+        if c == "\\" and i + 1 < len(raw):
+            i += 1
+            parts.append(re.escape(raw[i]))
+        else:
+            # An unescaped - keeps its range meaning; everything else is literal.
+            parts.append("-" if c == "-" else re.escape(c))
+        i += 1
+    else:
+        return None
+    regex = f"[{'^' if negate else ''}{''.join(parts)}]"
+    try:
+        re.compile(regex)
+    except re.error:
+        return None
+    return regex, i
+
+def _component_regex(raw):
+    """Compile one path component of a glob; a trailing / (a directory in a listing) is allowed."""
+    out = []
+    i = 0
+    while i < len(raw):
+        c = raw[i]
+        if c == "\\" and i + 1 < len(raw):
+            out.append(re.escape(raw[i + 1]))
+            i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            bracket = _bracket_regex(raw, i)
+            if bracket is None:
+                out.append(re.escape(c))
+            else:
+                out.append(bracket[0])
+                i = bracket[1]
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return re.compile("".join(out) + r"/?\Z", re.S)
+
+def glob_pattern(raw, listings):
+    """Return the sorted paths matching a glob (with escapes); listings memoizes directory reads."""
+    def scan(directory):
+        result = listings.get(directory)
+        if result is None:
+            result = listings[directory] = _cached_scan(directory or ".")
+        return result
+
+    def listing(directory):
+        return scan(directory)[0]
+
+    def listed(directory, name, want_dir):
+        # Membership in an already-read listing, or None if it was not read.
+        if directory not in listings or name in (".", ".."):
+            return None
+        names = listing(directory)
+        for candidate in ((name + "/",) if want_dir else (name, name + "/")):
+            i = bisect.bisect_left(names, candidate)
+            if i < len(names) and names[i] == candidate:
+                return True
+        return False
+
+    def walk(directory):
+        # `**`: the directory itself and every non-hidden directory below it,
+        # without following symlinks.
+        yield directory
+        names, links = scan(directory)
+        for name in names:
+            if name.endswith("/") and not name.startswith(".") and name not in links:
+                yield from walk(directory + name)
+
+    parts = raw.split("/")
+    prefixes = ["/"] if raw.startswith("/") else [""]
+    # Paths built from literal components have not been seen in a listing yet.
+    unverified = False
+    if raw.startswith("/"):
+        parts = parts[1:]
+    for index, part in enumerate(parts):
+        last = index == len(parts) - 1
+        if part == "":
+            if last:
+                prefixes = [prefix for prefix in prefixes if prefix.endswith("/") or os.path.isdir(prefix)]
+            continue
+        if part == "**":
+            found = []
+            for prefix in prefixes:
+                for directory in walk(prefix if prefix.endswith("/") or not prefix else prefix + "/"):
+                    found.append(directory)
+                    if last:
+                        found.extend(directory + name.rstrip("/") for name in listing(directory)
+                                     if not name.startswith(".") and not name.endswith("/"))
+            prefixes = [path.rstrip("/") if last else path for path in found if path or not last]
+            continue
+        if not _has_magic(part):
+            literal = _unescape(part)
+            kept = []
+            for prefix in prefixes:
+                present = listed(prefix, literal, not last)
+                if present is None:
+                    unverified = True
+                if present is not False:
+                    kept.append(prefix + literal + ("" if last else "/"))
+            prefixes = kept
+            continue
+        matcher = _component_regex(part).match
+        show_hidden = part.startswith(".") or part.startswith("\\.")
+        found = []
+        for prefix in prefixes:
+            if prefix and not prefix.endswith("/"):
+                prefix += "/"
+            for name in listing(prefix):
+                if (show_hidden or not name.startswith(".")) and matcher(name):
+                    if last:
+                        found.append(prefix + name.rstrip("/"))
+                    elif name.endswith("/"):
+                        found.append(prefix + name)
+        prefixes = found
+        unverified = False
+    return sorted(path for path in prefixes if path and (not unverified or os.path.lexists(path)))
+
+def expand_words(tokens):
+    """Apply brace and glob expansion to the Pattern words of a token list.
+
+    A pattern that matches nothing is passed on literally, as in sh.
+    Redirection targets are left alone.
+    """
+    expanded = []
+    listings = {}
+    previous = None
+    for token in tokens:
+        if isinstance(token, Pattern) and not (isinstance(previous, Operator) and previous != "|" and previous != "&"):
+            for raw in expand_braces(token.raw):
+                matches = glob_pattern(raw, listings) if _has_magic(raw) else []
+                expanded.extend(matches or [_unescape(raw)])
+        else:
+            expanded.append(token)
+        previous = token
+    return expanded
+
+_REDIRECT_FLAGS = {
+    "<": os.O_RDONLY,
+    ">": os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+    ">>": os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+}
+
+def _open_redirects(redirects, fds, opened):
+    """Apply redirections left to right to a {0, 1, 2: fd or None} table.
+
+    None means "inherit the shell's descriptor". Every descriptor opened here
+    is appended to `opened` so the caller can close it once the stage starts.
+    """
+    for fd, op, target in redirects:
+        if op == "dup":
+            source = fds[target]
+            new_fd = os.dup(target if source is None else source)
+        else:
+            flags = _REDIRECT_FLAGS[op] | getattr(os, "O_BINARY", 0)
+            new_fd = os.open(os.path.expanduser(target), flags, 0o666)
+        opened.append(new_fd)
+        fds[fd] = new_fd
+
+_ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+class _PlainStream:
+    """Stream wrapper that drops ANSI color codes with one regex pass per write."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text):
+        return self._stream.write(_ANSI_ESCAPE.sub("", text))
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+def _plain_stdout():
+    """Return a stdout stream that drops color codes, for pipes and files."""
+    return _PlainStream(sys.__stdout__)
+
+def _run_builtin_redirected(handler, args, redirects):
+    """Run a builtin in-process with fds 0-2 temporarily pointed at its redirections."""
+    fds = {0: None, 1: None, 2: None}
+    opened = []
+    saved = {}
+    previous_stdout = sys.stdout
+    try:
+        _open_redirects(redirects, fds, opened)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        for target, fd in fds.items():
+            if fd is not None:
+                saved[target] = os.dup(target)
+                os.dup2(fd, target)
+        if 1 in saved and not os.isatty(1):
+            sys.stdout = _plain_stdout()
+        return handler(args) or 0
+    except OSError as e:
+        print(f"{Fore.RED}Redirection failed: {e}{Style.RESET_ALL}")
+        return 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        sys.stdout = previous_stdout
+        for target, fd in saved.items():
+            os.dup2(fd, target)
+            os.close(fd)
+        for fd in opened:
+            os.close(fd)
+
+def _fork_builtin(handler, args, fds, close_fds, pgid=None):
+    """Run a builtin as a forked pipeline stage (or parallel job) and return the child's pid."""
+    global _job_control
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid:
+        return pid
+    status = 1
+    try:
+        # Commands the builtin runs stay in the pipeline's process group.
+        _job_control = False
+        if pgid is not None:
+            os.setpgid(0, pgid)
+        for signum in (signal.SIGINT, signal.SIGPIPE, signal.SIGTSTP, signal.SIGTTIN, signal.SIGTTOU):
+            # An ignored SIGTSTP (see run_parallel) stays ignored, as across exec.
+            if signum != signal.SIGTSTP or signal.getsignal(signum) is not signal.SIG_IGN:
+                signal.signal(signum, signal.SIG_DFL)
+        for target, fd in fds.items():
+            if fd is not None:
+                os.dup2(fd, target)
+        for fd in close_fds:
+            if fd is not None and fd > 2:
+                os.close(fd)
+        if not os.isatty(1):
+            sys.stdout = _plain_stdout()
+        status = handler(args) or 0
+        sys.stdout.flush()
+    except BaseException:
+        pass
+    finally:
+        os._exit(status)
+
+def _process_group_options(pgid):
+    """Popen keyword arguments that put the child in process group pgid (0: a new one)."""
+    if sys.version_info >= (3, 11):
+        return {"process_group": pgid}
+    return {"preexec_fn": lambda: os.setpgid(0, pgid)}
+
+def run_pipeline(stages, background=False, command=""):
+    """Run parsed pipeline stages connected by OS pipes; return the last stage's status.
+
+    External stages are spawned with their stdin/stdout bound directly to the
+    pipe and redirection descriptors, so the data never passes through this
+    process. Builtin stages are forked so they stream concurrently; a lone
+    foreground builtin with redirections runs in-process so `cd` and friends
+    still work. With job control every pipeline gets its own process group;
+    background pipelines are added to the job table instead of waited for.
+    """
+    if not background and len(stages) == 1 and stages[0][0][0] in BUILTINS:
+        argv, redirects = stages[0]
+        return _run_builtin_redirected(BUILTINS[argv[0]], argv[1:], redirects)
+
+    job = Job(command or " | ".join(" ".join(argv) for argv, _ in stages))
+    prev_read = None
+    for index, (argv, redirects) in enumerate(stages):
+        fds = {0: prev_read, 1: None, 2: None}
+        opened = [] if prev_read is None else [prev_read]
+        next_read = None
+        pgid = job.pgid or 0 if _job_control else None
+        try:
+            if index < len(stages) - 1:
+                next_read, fds[1] = os.pipe()
+                opened.append(fds[1])
+            _open_redirects(redirects, fds, opened)
+            if argv[0] in BUILTINS:
+                if not hasattr(os, "fork"):
+                    raise OSError(f"{argv[0]}: builtins cannot be pipeline stages on this platform")
+                pid = _fork_builtin(BUILTINS[argv[0]], argv[1:], fds, opened + [next_read], pgid)
+                job.add(pid)
+            else:
+                options = _process_group_options(pgid) if pgid is not None else {}
+                process = spawn(argv, stdin=fds[0], stdout=fds[1], stderr=fds[2], **options)
+                job.add(process.pid, process)
+                pid = process.pid
+            if pgid is not None:
+                job.pgid = job.pgid or pid
+                try:
+                    os.setpgid(pid, job.pgid)
+                except OSError:
+                    pass
+                if not background and index == 0:
+                    _give_terminal_to(job.pgid)
+        except FileNotFoundError:
+            print(f"{Fore.RED}Command not found: {argv[0]}{Style.RESET_ALL}")
+            job.add(None, status=127)
+        except OSError as e:
+            print(f"{Fore.RED}Error executing command: {e}{Style.RESET_ALL}")
+            job.add(None, status=1)
+        finally:
+            for fd in opened:
+                os.close(fd)
+        prev_read = next_read
+
+    if background:
+        job.id = max(jobs, default=0) + 1
+        jobs[job.id] = job
+        if _interactive:
+            print(f"[{job.id}] {job.pgid or job.last_pid()}")
+        return 0
+    return wait_for_job(job)
+
+# Job control
+# Interactive sessions on a terminal put each pipeline in its own process
+# group and hand that group the terminal while it runs in the foreground, so
+# Ctrl-C and Ctrl-Z reach the job and not the shell.
+jobs = {}
+_job_control = False
+_shell_pgid = None
+
+class Job:
+    """A launched pipeline: its process group, processes and state."""
+
+    def __init__(self, command):
+        self.id = None
+        self.command = command
+        self.pgid = None
+        self.processes = []
+        self.state = "Running"
+
+    def add(self, pid, popen=None, status=None):
+        self.processes.append([pid, popen, status])
+
+    def last_pid(self):
+        return next((pid for pid, _, _ in reversed(self.processes) if pid), None)
+
+    def pending(self):
+        return [process for process in self.processes if process[0] and process[2] is None]
+
+    def status(self):
+        return self.processes[-1][2] if self.processes else 0
+
+    def update(self, block=False):
+        """Reap finished processes; return True if the job stopped (Ctrl-Z, SIGSTOP)."""
+        if not hasattr(os, "WUNTRACED"):
+            # No job control (Windows): jobs cannot stop, and Popen waits on
+            # the process handle that os.waitpid would expect instead of a pid.
+            for process in self.pending():
+                process[2] = process[1].wait() if block else process[1].poll()
+            if not self.pending():
+                self.state = "Done"
+            return False
+        flags = os.WUNTRACED | (0 if block else os.WNOHANG)
+        for process in self.pending():
+            pid, popen, _ = process
+            try:
+                waited, raw = os.waitpid(pid, flags)
+            except ChildProcessError:
+                waited, raw = pid, 0
+            if not waited:
+                continue
+            if os.WIFSTOPPED(raw):
+                self.state = "Stopped"
+                return True
+            process[2] = os.waitstatus_to_exitcode(raw)
+            if popen is not None:
+                popen.returncode = process[2]
+        if not self.pending():
+            self.state = "Done"
+        return False
+
+def init_job_control():
+    """Enable job control when the shell runs interactively on a terminal."""
+    global _job_control, _shell_pgid
+    if not (hasattr(os, "tcsetpgrp") and os.isatty(0)):
+        return
+    try:
+        # Fails unless the terminal is our controlling terminal, as in a
+        # daemon session (see serve), where job control is left off.
+        os.tcgetpgrp(0)
+    except OSError:
+        return
+    # Handlers (unlike SIG_IGN) are reset to the default when a child execs,
+    # so jobs can still be stopped while the shell itself ignores Ctrl-Z.
+    for signum in (signal.SIGTSTP, signal.SIGTTIN, signal.SIGTTOU):
+        signal.signal(signum, lambda sig, frame: None)
+    _shell_pgid = os.getpgrp()
+    _job_control = True
+
+def _give_terminal_to(pgid):
+    # A background process calling tcsetpgrp gets SIGTTOU unless it is blocked.
+    if not _job_control:
+        return
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTTOU})
+    try:
+        os.tcsetpgrp(0, pgid)
+    except OSError:
+        pass
+    finally:
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTTOU})
+
+def wait_for_job(job):
+    """Wait for a foreground job to finish or stop; return its exit status."""
+    if job.pgid:
+        _give_terminal_to(job.pgid)
+    try:
+        while job.pending():
+            try:
+                stopped = job.update(block=True)
+            except KeyboardInterrupt:
+                # Without job control the children share our SIGINT; keep
+                # waiting so they are reaped.
+                continue
+            if stopped:
+                job.id = job.id or max(jobs, default=0) + 1
+                jobs[job.id] = job
+                print(f"\n[{job.id}]+  Stopped                 {job.command}")
+                return 128 + signal.SIGTSTP
+    finally:
+        if job.pgid:
+            _give_terminal_to(_shell_pgid)
+    jobs.pop(job.id, None)
+    return job.status()
+
+def start_foreground(args, command=None, **kwargs):
+    """Spawn an external command as a foreground job; return (Job, Popen).
+
+    With job control the child gets its own process group, so Ctrl-Z stops
+    it (and wait_for_job moves it to the job table) instead of hanging the
+    shell, which ignores SIGTSTP.
+    """
+    if _job_control:
+        kwargs.update(_process_group_options(0))
+    process = spawn(args, **kwargs)
+    job = Job(command or shlex.join(args))
+    job.add(process.pid, process)
+    if _job_control:
+        job.pgid = process.pid
+        try:
+            os.setpgid(process.pid, process.pid)
+        except OSError:
+            pass
+    return job, process
+
+def run_foreground(args, command=None, **kwargs):
+    """Run an external command as a foreground job; return its exit status."""
+    job, _ = start_foreground(args, command, **kwargs)
+    return wait_for_job(job)
+
+def report_finished_jobs():
+    """Report background jobs that stopped or finished since the last prompt."""
+    for job_id, job in list(jobs.items()):
+        if job.state == "Running" and job.update():
+            print(f"[{job_id}]+  Stopped                 {job.command}")
+        if job.state == "Done":
+            print(f"[{job_id}]+  Done                    {job.command}")
+            del jobs[job_id]
+
+def _find_job(spec):
+    """Resolve `%n`, `n` or nothing (the most recent job) to a Job."""
+    if not jobs:
+        raise ValueError("no current job")
+    if spec is None:
+        return jobs[max(jobs)]
+    job_id = spec[1:] if spec.startswith("%") else spec
+    if not job_id.isdigit() or int(job_id) not in jobs:
+        raise ValueError(f"{spec}: no such job")
+    return jobs[int(job_id)]
+
+def _signal_job(job, signum):
+    if job.pgid:
+        os.killpg(job.pgid, signum)
+    else:
+        for pid, _, _ in job.pending():
+            os.kill(pid, signum)
+
+def _continue_job(job):
+    if job.state == "Stopped":
+        _signal_job(job, signal.SIGCONT)
+        job.state = "Running"
+
+def exit_status(error):
+    """The process exit status a SystemExit stands for."""
+    return error.code if isinstance(error.code, int) else (0 if error.code is None else 1)
+
+# Embedding
+Result = collections.namedtuple("Result", ["command", "status", "data", "output", "error", "wall", "user", "sys",
+                                           "stderr"], defaults=("",))
+
+class Shell:
+    """Run command lines in-process and get Results back instead of printed text.
+
+        shell = Shell("/srv/project")
+        result = shell.run("find .py src -type f")
+        result.status, result.data      # 0, ['src/app.py', ...]
+
+    A simple command whose builtin has a collector returns its data directly
+    (ls: entry dicts, find: paths, cat: bytes, sysinfo: a dict, ...) with no
+    formatting at all. Anything else (pipelines, external programs, other
+    builtins) runs normally and its stdout and stderr are captured, without
+    colors, into Result.output and Result.stderr. Each Shell keeps its own working directory; the process
+    directory is switched to it for the duration of run(), so a Shell must
+    not be used from several threads at once.
+    """
+
+    def __init__(self, cwd=None):
+        self.cwd = os.path.abspath(cwd or os.getcwd())
+        self.last_status = 0
+
+    def run(self, command):
+        """Run one command line; return a Result."""
+        previous = os.getcwd()
+        os.chdir(self.cwd)
+        try:
+            try:
+                args, background = split_background(expand_words(tokenize(command)))
+                stages = parse_pipeline(args)
+            except ValueError as e:
+                return self._finish(Result(command, 2, None, "", str(e), 0.0, 0.0, 0.0))
+            if not stages:
+                return self._finish(Result(command, 0, None, "", None, 0.0, 0.0, 0.0))
+            argv, redirects = stages[0]
+            if len(stages) == 1 and not redirects and not background and argv[0] in COLLECTORS:
+                try:
+                    (status, data), wall, user, system, _ = timed(COLLECTORS[argv[0]], argv[1:])
+                except (OSError, ValueError) as e:
+                    return self._finish(Result(command, 1, None, "", f"{argv[0]}: {e}", 0.0, 0.0, 0.0))
+                return self._finish(Result(command, status, data, "", None, wall, user, system))
+            if background:
+                status, wall, user, system, _ = timed(run_pipeline, stages, True, command)
+                return self._finish(Result(command, status, None, "", None, wall, user, system))
+            return self._finish(self._run_captured(command, stages))
+        finally:
+            self.cwd = os.getcwd()
+            os.chdir(previous)
+
+    def _run_captured(self, command, stages):
+        import tempfile
+        paths = []
+        for _ in range(2):
+            fd, path = tempfile.mkstemp(prefix="shell-output-")
+            os.close(fd)
+            paths.append(path)
+        out_path, err_path = paths
+        previous_stdout, previous_stderr = sys.stdout, sys.stderr
+        try:
+            # Put the captures first so the command's own `>` and `2>`
+            # redirections still win. Everything appends, so messages this
+            # process prints (such as "Command not found") land in order with
+            # the output.
+            stages[-1][1].insert(0, (1, ">>", out_path))
+            for _, redirects in stages:
+                redirects.insert(0, (2, ">>", err_path))
+            with open(out_path, "a", encoding="utf-8") as sink, open(err_path, "a", encoding="utf-8") as err_sink:
+                sys.stdout = _PlainStream(sink)
+                sys.stderr = _PlainStream(err_sink)
+                started = time.perf_counter()
+                try:
+                    status, wall, user, system, _ = timed(run_pipeline, stages)
+                except SystemExit as e:
+                    # `exit N` ends this command with status N, not the host process.
+                    status, wall, user, system = exit_status(e), time.perf_counter() - started, 0.0, 0.0
+                finally:
+                    sys.stdout = previous_stdout
+                    sys.stderr = previous_stderr
+            captured = []
+            for path in paths:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    captured.append(_ANSI_ESCAPE.sub("", f.read()))
+            output, stderr = captured
+        finally:
+            for path in paths:
+                os.unlink(path)
+        return Result(command, status, None, output, None, wall, user, system, stderr)
+
+    def _finish(self, result):
+        self.last_status = result.status
+        return result
+
+# Daemon
+# `--serve` keeps one warm process listening on a Unix socket. The client
+# (shell-client.py) sends its argv, cwd and environment together with its
+# stdin, stdout and stderr descriptors (SCM_RIGHTS). The daemon forks a
+# session per connection that runs main() directly on those descriptors, so
+# output streams straight to the client's terminal or pipe and every session
+# has its own cwd, environment and history. The session reports its pid
+# first (so the client can forward Ctrl-C) and its exit status last.
+#
+# A client hands over its environment and terminal, so both ends make sure
+# the other is the same user: the socket lives in $XDG_RUNTIME_DIR or in a
+# 0700 directory of our own under /tmp, and each side checks the peer's uid
+# (SO_PEERCRED on Linux, LOCAL_PEERCRED on macOS) after connecting.
+def default_socket_path():
+    """Return $SHELL_SOCKET, else a per-user socket path (shell-client.py computes the same)."""
+    if os.environ.get("SHELL_SOCKET"):
+        return os.environ["SHELL_SOCKET"]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "my_personal_shell.sock")
+    return os.path.join(_fallback_socket_dir(), "shell.sock")
+
+def _fallback_socket_dir():
+    return os.path.join("/tmp", f"my_personal_shell-{os.getuid()}")
+
+def _is_private_dir(directory):
+    """True if directory is a real directory owned by us that nobody else can access."""
+    try:
+        st = os.lstat(directory)
+    except OSError:
+        return False
+    return stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid() and not st.st_mode & 0o077
+
+def peer_uid(conn):
+    """Return the uid of the process at the other end of a Unix socket, or None if unknown."""
+    import socket
+    import struct
+    if hasattr(socket, "SO_PEERCRED"):
+        _, uid, _ = struct.unpack("3i", conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")))
+        return uid
+    if hasattr(socket, "LOCAL_PEERCRED"):
+        # struct xucred: u_int version, uid_t uid, short ngroups, gid_t groups[16]
+        return struct.unpack_from("2I", conn.getsockopt(0, socket.LOCAL_PEERCRED, 76))[1]
+    return None
+
+def _reap_sessions(signum=None, frame=None):
+    try:
+        while os.waitpid(-1, os.WNOHANG)[0]:
+            pass
+    except ChildProcessError:
+        pass
+
+def _run_session(conn):
+    """Body of a forked session: adopt the client's descriptors, run main(), report the status."""
+    import socket
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    message, fds, _, _ = socket.recv_fds(conn, 1 << 20, 3)
+    request = json.loads(message)
+    # A new session and process group, so the client can signal all of it.
+    os.setsid()
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+    sys.stdin = sys.__stdin__ = open(0, "r", closefd=False)
+    sys.stdout = sys.__stdout__ = open(1, "w", buffering=1 if os.isatty(1) else -1, closefd=False)
+    sys.stderr = sys.__stderr__ = open(2, "w", buffering=1, closefd=False)
+    os.environ.clear()
+    os.environ.update(request["env"])
+    reload_settings()
+    os.chdir(request["cwd"])
+    conn.sendall(json.dumps({"pid": os.getpid()}).encode() + b"\n")
+    status = 1
+    try:
+        status = main(request["argv"])
+    except SystemExit as e:
+        status = exit_status(e)
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except OSError:
+                pass
+        conn.sendall(json.dumps({"status": status}).encode() + b"\n")
+    return status
+
+def serve(socket_path=None):
+    """Listen on a Unix socket and run one forked session per client connection."""
+    import socket
+    socket_path = socket_path or default_socket_path()
+    # Warm up what sessions would otherwise import on first use.
+    for module in ("readline", "concurrent.futures", "tempfile", "requests", "tqdm"):
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+    directory = os.path.dirname(socket_path)
+    if directory == _fallback_socket_dir():
+        try:
+            os.mkdir(directory, 0o700)
+        except FileExistsError:
+            pass
+        if not _is_private_dir(directory):
+            print(f"{Fore.RED}Refusing to serve: {directory} is not a private directory owned by you"
+                  f"{Style.RESET_ALL}", file=sys.stderr)
+            return 1
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    if os.path.exists(socket_path):
+        try:
+            server.connect(socket_path)
+        except OSError:
+            os.unlink(socket_path)
+        else:
+            print(f"{Fore.RED}A shell daemon is already listening on {socket_path}{Style.RESET_ALL}", file=sys.stderr)
+            return 1
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        server.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    server.listen(64)
+    signal.signal(signal.SIGCHLD, _reap_sessions)
+    # Stop cleanly (removing the socket) on SIGTERM as well as Ctrl-C.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print(f"Shell daemon listening on {socket_path} (pid {os.getpid()})", file=sys.stderr)
+    try:
+        while True:
+            conn, _ = server.accept()
+            uid = peer_uid(conn)
+            if uid is not None and uid != os.getuid():
+                print(f"{Fore.RED}Rejected a connection from uid {uid}{Style.RESET_ALL}", file=sys.stderr)
+                conn.close()
+                continue
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                server.close()
+                status = 1
+                try:
+                    status = _run_session(conn)
+                except BaseException:
+                    pass
+                finally:
+                    os._exit(status & 0xFF if isinstance(status, int) else 1)
+            conn.close()
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        server.close()
+        try:
+            os.unlink(socket_path)
+        except OSError:
+            pass
+
+def print_startup_profile():
+    total = sum(seconds for _, seconds in _startup_phases)
+    print(f"{Fore.YELLOW}Startup profile:{Style.RESET_ALL}")
+    for name, seconds in _startup_phases:
+        print(f"  {name:<22}{seconds * 1000:8.1f} ms")
+    print(f"  {'total':<22}{total * 1000:8.1f} ms")
+
+def run_line(command):
+    """Run one command line (pipeline, background job or simple command); return its status."""
+    global last_status
+    if STATS_ENABLED:
+        status, wall, user, system, _ = timed(_run_line, command)
+        record_command(command, status, wall, user, system)
+    else:
+        status = _run_line(command)
+    last_status = status
+    return status
+
+def run_line_guarded(command):
+    """run_line, with any unexpected error printed and counted as status 1 instead of ending the shell."""
+    global last_status
+    try:
+        return run_line(command)
+    except BrokenPipeError:
+        # Left to the caller: in a batch it means the reader has gone away.
+        raise
+    except Exception as e:
+        print(f"{Fore.RED}Error: {e}{Style.RESET_ALL}")
+        last_status = 1
+        return 1
+
+def _run_line(command):
+    try:
+        args, background = split_background(expand_words(tokenize(command)))
+        if background or any(isinstance(arg, Operator) for arg in args):
+            stages = parse_pipeline(args)
+            status = run_pipeline(stages, background, command.strip().rstrip("&").rstrip()) if stages else 0
+        else:
+            status = dispatch(args) if args else 0
+    except ValueError as e:
+        print(f"{Fore.RED}Syntax error: {e}{Style.RESET_ALL}")
+        status = 2
+    return status
+
+def run_batch(lines, fail_fast=False):
+    """Run command lines back to back without prompts; return the last status.
+
+    Blank lines and `#` comments (including a `#!` line) are skipped. With
+    fail_fast the first non-zero status stops the batch.
+    """
+    status = 0
+    for line in lines:
+        line = line.rstrip("\r\n")
+        stripped = line.lstrip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        status = run_line_guarded(line)
+        if status and fail_fast:
+            break
+    return status
+
+def disable_color():
+    """Drop colors for non-interactive runs."""
+    global _interactive
+    _interactive = False
+    # The codes are read on every print, so blanking them costs nothing per line.
+    for codes in (Fore, Back, Style):
+        for name in list(vars(codes)):
+            setattr(codes, name, "")
+
+USAGE = ("usage: updated-shell.py [-e] [-i] [--profile-startup] [-c COMMAND | SCRIPT | -]\n"
+         "       updated-shell.py --serve [--socket PATH]")
+
+def parse_options(argv):
+    """Parse the command line; raise ValueError for a usage error."""
+    options = {"command": None, "script": None, "fail_fast": False,
+               "interactive": False, "profile_startup": False, "serve": False, "socket": None}
+    args = iter(argv)
+    for arg in args:
+        if arg == "-c":
+            options["command"] = next(args, None)
+            if options["command"] is None:
+                raise ValueError("-c: option requires an argument")
+        elif arg in ("-e", "--fail-fast"):
+            options["fail_fast"] = True
+        elif arg == "-i":
+            options["interactive"] = True
+        elif arg == "--profile-startup":
+            options["profile_startup"] = True
+        elif arg == "--serve":
+            options["serve"] = True
+        elif arg == "--socket":
+            options["socket"] = next(args, None)
+            if options["socket"] is None:
+                raise ValueError("--socket: option requires an argument")
+        elif arg.startswith("-") and arg != "-":
+            raise ValueError(f"{arg}: invalid option")
+        else:
+            options["script"] = arg
+            break
+    return options
+
+def main(argv=()):
+    """Start the shell; return the exit status.
+
+    `-c COMMAND` runs COMMAND (one command per line), SCRIPT runs a file and
+    `-` or a non-terminal stdin runs lines from stdin. These batch modes print
+    no prompt or colors and exit with the last command's status; `-e` stops at
+    the first failing command. Otherwise the interactive prompt starts.
+    """
+    try:
+        options = parse_options(argv)
+    except ValueError as e:
+        print(f"updated-shell.py: {e}\n{USAGE}", file=sys.stderr)
+        return 2
+    if options["serve"]:
+        return serve(options["socket"])
+    batch = options["command"] is not None or options["script"] is not None or \
+        not (options["interactive"] or sys.stdin.isatty())
+    if batch:
+        disable_color()
+        _startup_phase("shell ready")
+        if options["profile_startup"]:
+            print_startup_profile()
+        if options["command"] is not None:
+            lines = options["command"].split("\n")
+        elif options["script"] not in (None, "-"):
+            try:
+                lines = open(options["script"], encoding="utf-8")
+            except OSError as e:
+                print(f"updated-shell.py: {options['script']}: {e.strerror}", file=sys.stderr)
+                return 127
+        else:
+            lines = sys.stdin
+        try:
+            status = run_batch(lines, options["fail_fast"])
+            sys.stdout.flush()
+            return status
+        except BrokenPipeError:
+            # The reader went away (`... | head`). As the Python docs advise,
+            # point stdout at devnull so the interpreter's final flush does
+            # not fail again, and exit quietly.
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 1
+        except KeyboardInterrupt:
+            return 130
+        finally:
+            if lines is not sys.stdin and hasattr(lines, "close"):
+                lines.close()
+
+    # colorama is only set up for the interactive prompt; importing this file
+    # as a library (see Shell) leaves the host's stdout alone.
+    init(autoreset=True)
+    _startup_phase("terminal setup")
+    load_history()
+    readline = init_readline() if sys.stdin.isatty() else None
+    _startup_phase("history")
+    init_job_control()
+    _startup_phase("shell ready")
+    if options["profile_startup"]:
+        print_startup_profile()
+
+    while True:
+        report_finished_jobs()
+        current_dir = os.getcwd()
+        try:
+            command = input(f"{Fore.CYAN}{current_dir} $ {Style.RESET_ALL}")
+        except EOFError:
+            print(f"\n{Fore.RED}Exiting shell...{Style.RESET_ALL}")
+            return last_status
+        except KeyboardInterrupt:
+            print()
+            continue
+
+        if not command.strip():
+            continue
+        try:
+            expanded = expand_history(command)
+        except ValueError as e:
+            print(f"{Fore.RED}{e}{Style.RESET_ALL}")
+            continue
+        if expanded != command:
+            print(expanded)
+            command = expanded
+            if readline is not None and readline.get_current_history_length():
+                readline.replace_history_item(readline.get_current_history_length() - 1, command)
+        add_history(command)
+        try:
+            run_line_guarded(command)
+        except KeyboardInterrupt:
+            print()
+        except BrokenPipeError as e:
+            print(f"{Fore.RED}Error: {e}{Style.RESET_ALL}")
 
-        execute_command(command)
+_startup_phase("builtin definitions")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main(sys.argv[1:]))